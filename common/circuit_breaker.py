@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from django.conf import settings
+
+from common.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int = 50,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_ms: float = 1000.0,
+        slow_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 3,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        # Скользящее окно последних вызовов: (ошибка, медленный)
+        self.outcomes = deque(maxlen=window)
+        self.state = CLOSED
+        self.changed_at = time.monotonic()
+        self.probes = 0
+        self.probe_successes = 0
+        self.lock = threading.Lock()
+        metrics.gauge("circuit_breaker_state", lambda: STATE_VALUES[self.current_state()], breaker=name)
+
+    def _transition(self, state: str):
+        logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        self.changed_at = time.monotonic()
+        self.outcomes.clear()
+        self.probes = 0
+        self.probe_successes = 0
+        metrics.counter("circuit_breaker_transitions_total", breaker=self.name, state=state).inc()
+
+    def _advance(self):
+        if time.monotonic() - self.changed_at < self.open_seconds:
+            return
+        if self.state == OPEN:
+            self._transition(HALF_OPEN)
+        elif self.state == HALF_OPEN and self.probes >= self.half_open_calls:
+            # пробные вызовы так и не завершились - выдаем новые
+            self.probes = self.probe_successes
+            self.changed_at = time.monotonic()
+
+    def current_state(self) -> str:
+        with self.lock:
+            self._advance()
+            return self.state
+
+    def allow(self) -> bool:
+        with self.lock:
+            self._advance()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self.probes < self.half_open_calls:
+                self.probes += 1
+                return True
+        metrics.counter("circuit_breaker_rejected_total", breaker=self.name).inc()
+        return False
+
+    def _record(self, failed: bool, slow: bool):
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._transition(OPEN)
+                return
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+
+        # Результат вызова, начатого до размыкания, окно не меняет
+        if self.state != CLOSED:
+            return
+        self.outcomes.append((failed, slow))
+        if len(self.outcomes) < self.min_calls:
+            return
+        failures = sum(1 for failed, _ in self.outcomes if failed)
+        slow_calls = sum(1 for _, slow in self.outcomes if slow)
+        if failures / len(self.outcomes) >= self.error_rate or slow_calls / len(self.outcomes) >= self.slow_rate:
+            self._transition(OPEN)
+
+    def record_success(self, latency_ms: float):
+        with self.lock:
+            self._record(False, latency_ms >= self.slow_call_ms)
+
+    def record_failure(self):
+        with self.lock:
+            self._record(True, False)
+
+    @contextmanager
+    def measure(self):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success((time.perf_counter() - started) * 1000)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            self._advance()
+            calls = len(self.outcomes)
+            failures = sum(1 for failed, _ in self.outcomes if failed)
+            slow_calls = sum(1 for _, slow in self.outcomes if slow)
+            return {
+                "state": self.state,
+                "seconds_in_state": round(time.monotonic() - self.changed_at, 3),
+                "calls": calls,
+                "error_rate": failures / calls if calls else 0.0,
+                "slow_rate": slow_calls / calls if calls else 0.0,
+            }
+
+
+circuit_breakers = {}
+
+
+def build_circuit_breaker(name: str, config: Dict[str, Any] = None) -> CircuitBreaker:
+    breaker = CircuitBreaker(name, **(config or {}))
+    circuit_breakers[name] = breaker
+    return breaker
+
+
+elasticsearch_breaker = build_circuit_breaker(
+    "elasticsearch", getattr(settings, "ELASTICSEARCH_CIRCUIT_BREAKER", {})
+)
@@ -1,19 +1,64 @@
-import json
+import atexit
 import logging
-from typing import Dict, Any
+import queue
+import threading
+import time
+from typing import Dict, Any, List
 from kafka import KafkaProducer
 from django.conf import settings
 
+from common.kafka_codec import event_codec
+from common.metrics import metrics
+from common.kafka_spool import SegmentSpool
+
 logger = logging.getLogger(__name__)
 
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_NEW = "drop_new"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+
+_STOP = object()
+
 
 class KafkaMessageProducer:
     def __init__(self):
         self.producer = None
+        self.config = getattr(settings, "KAFKA_PRODUCER_CONFIG", {})
+        self.async_mode = self.config.get("async", True)
+        self.overflow_policy = self.config.get("overflow_policy", OVERFLOW_DROP_OLDEST)
+        self.queue = queue.Queue(maxsize=self.config.get("queue_size", 10000))
+        self.sender = None
+        # Остановка - отдельное событие: _STOP в очереди только будит отправителя,
+        # политика drop_oldest может его вытеснить
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.stats = {"enqueued": 0, "sent": 0, "failed": 0, "dropped": 0, "spooled": 0, "replayed": 0}
+        self.next_init_attempt = 0.0
+        self.next_replay = 0.0
+
+        spool_config = getattr(settings, "KAFKA_SPOOL_CONFIG", {})
+        self.init_retry_interval = spool_config.get("init_retry_interval", 30)
+        self.replay_interval = spool_config.get("replay_interval", 5)
+        self.spool = None
+        if spool_config.get("directory"):
+            self.spool = SegmentSpool(
+                spool_config["directory"],
+                segment_bytes=spool_config.get("segment_bytes", 8 * 1024 * 1024),
+                max_bytes=spool_config.get("max_bytes", 256 * 1024 * 1024),
+                fsync_every=spool_config.get("fsync_every", 100),
+                fsync_interval=spool_config.get("fsync_interval", 1.0),
+            )
+
+        self.send_latency = metrics.histogram("kafka_producer_send_latency_ms")
+        self.queue_wait = metrics.histogram("kafka_producer_queue_wait_ms")
+        metrics.gauge("kafka_producer_queue_depth", self.queue.qsize)
+        metrics.gauge("kafka_producer_spool_bytes", lambda: self.spool.size() if self.spool is not None else 0)
     
     def _init_producer(self):
         if self.producer is not None:
             return
+        if time.monotonic() < self.next_init_attempt:
+            return
             
         try:
             kafka_config = getattr(settings, "KAFKA_CONFIG", {})
@@ -27,43 +72,238 @@ class KafkaMessageProducer:
                 
             self.producer = KafkaProducer(
                 bootstrap_servers=bootstrap_servers,
-                value_serializer=lambda v: json.dumps(v, ensure_ascii=False).encode("utf-8"),
+                value_serializer=event_codec.encode,
                 key_serializer=lambda k: k.encode("utf-8") if k else None,
                 retries=3,
-                acks="all"
+                acks=self.config.get("acks", "all"),
+                linger_ms=self.config.get("linger_ms", 20),
+                batch_size=self.config.get("batch_size", 64 * 1024),
+                compression_type=self.config.get("compression_type", "gzip"),
             )
             logger.info("Kafka producer успешно инициализирован")
         except Exception as e:
             logger.error(f"Ошибка инициализации Kafka producer: {e}")
             self.producer = None
+            self.next_init_attempt = time.monotonic() + self.init_retry_interval
     
     def send_message(self, topic: str, message: Dict[str, Any], key: str = None) -> bool:
+        if self.async_mode:
+            return self._enqueue((topic, message, key, time.perf_counter()))
+        return self._send_sync(topic, message, key)
+
+    def _send_sync(self, topic: str, message: Dict[str, Any], key: str = None) -> bool:
         if not self.producer:
             self._init_producer()
             
         if not self.producer:
             logger.error("Kafka producer не инициализирован")
+            self._spool(topic, message, key)
             return False
-        
+
+        # В синхронном режиме нет фонового отправителя: спул разбирается здесь же, раньше новых событий
+        if self.spool is not None and self.spool.has_data():
+            if time.monotonic() >= self.next_replay:
+                self.next_replay = time.monotonic() + self.replay_interval
+                self.replay_spool()
+            if self.spool.has_data():
+                # Хвост спула старше нового события: оно встает за ним, иначе порядок нарушится
+                self._spool(topic, message, key)
+                return False
+
         try:
-            future = self.producer.send(topic, value=message, key=key)
-            record_metadata = future.get(timeout=10)
+            with self.send_latency.time():
+                future = self.producer.send(topic, value=message, key=key)
+                record_metadata = future.get(timeout=10)
             logger.info(
                 f"Сообщение отправлено в Kafka: topic={record_metadata.topic}, "
                 f"partition={record_metadata.partition}, offset={record_metadata.offset}"
             )
+            self._count("sent")
             return True
         except Exception as e:
             logger.error(f"Ошибка отправки сообщения в Kafka: {e}")
+            self._count("failed")
+            self._spool(topic, message, key)
             return False
-    
+
+    def _spool(self, topic: str, message: Dict[str, Any], key: str = None) -> bool:
+        if self.spool is None:
+            return False
+        if self.spool.append(topic, message, key):
+            self._count("spooled")
+            return True
+        self._count("dropped")
+        return False
+
+    def _send_spooled(self, records: List[Dict[str, Any]]) -> int:
+        futures = [
+            self.producer.send(record["topic"], value=record["value"], key=record["key"])
+            for record in records
+        ]
+        self.producer.flush()
+
+        sent = 0
+        for future in futures:
+            try:
+                future.get(timeout=0)
+            except Exception as e:
+                logger.error(f"Ошибка повторной отправки сообщения из спула в Kafka: {e}")
+                break
+            sent += 1
+        return sent
+
+    def replay_spool(self) -> int:
+        if self.spool is None or not self.spool.has_data():
+            return 0
+        if not self.producer:
+            self._init_producer()
+        if not self.producer:
+            return 0
+
+        try:
+            replayed = self.spool.drain(self._send_spooled)
+        except Exception as e:
+            logger.error(f"Ошибка повторной отправки спула Kafka: {e}")
+            return 0
+        if replayed:
+            self._count("replayed", replayed)
+            logger.info(f"Из спула Kafka отправлено сообщений: {replayed}")
+        return replayed
+
+    def _count(self, name: str, value: int = 1):
+        with self.lock:
+            self.stats[name] += value
+        metrics.counter(f"kafka_producer_{name}_total").inc(value)
+
+    def _ensure_sender(self):
+        with self.lock:
+            if self.sender is None or not self.sender.is_alive():
+                self.stopping.clear()
+                self.sender = threading.Thread(target=self._run_sender, name="kafka-sender", daemon=True)
+                self.sender.start()
+
+    def _enqueue(self, item) -> bool:
+        self._ensure_sender()
+
+        try:
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                self.queue.put(item, timeout=self.config.get("block_timeout", 1.0))
+            elif self.overflow_policy == OVERFLOW_DROP_NEW:
+                self.queue.put_nowait(item)
+            else:
+                while True:
+                    try:
+                        self.queue.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            if self.queue.get_nowait() is not _STOP:
+                                self._count("dropped")
+                        except queue.Empty:
+                            pass
+        except queue.Full:
+            self._count("dropped")
+            logger.warning("Очередь Kafka переполнена, сообщение отброшено")
+            return False
+
+        self._count("enqueued")
+        return True
+
+    def _run_sender(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=0.1 if self.stopping.is_set() else self.replay_interval)
+            except queue.Empty:
+                if self.stopping.is_set():
+                    break
+                self.replay_spool()
+                continue
+            if item is _STOP:
+                continue
+
+            topic, message, key, enqueued_at = item
+            self.queue_wait.observe((time.perf_counter() - enqueued_at) * 1000)
+            if self.spool is not None and self.spool.has_data():
+                self._spool(topic, message, key)
+                self.replay_spool()
+                continue
+
+            if not self.producer:
+                self._init_producer()
+            if not self.producer:
+                if not self._spool(topic, message, key):
+                    self._count("failed")
+                continue
+
+            try:
+                started = time.perf_counter()
+                future = self.producer.send(topic, value=message, key=key)
+                future.add_callback(self._on_delivered, started)
+                future.add_errback(self._on_delivery_failed, topic, message, key)
+            except Exception as e:
+                logger.error(f"Ошибка отправки сообщения в Kafka: {e}")
+                self._count("failed")
+                self._spool(topic, message, key)
+
+    def _on_delivered(self, started, record_metadata):
+        self.send_latency.observe((time.perf_counter() - started) * 1000)
+        self._count("sent")
+
+    def _on_delivery_failed(self, topic, message, key, exc):
+        logger.error(f"Ошибка доставки сообщения в Kafka: {exc}")
+        self._count("failed")
+        self._spool(topic, message, key)
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.queue.qsize()
+        stats["spool_bytes"] = self.spool.size() if self.spool is not None else 0
+        return stats
+
     def close(self):
+        # Вызывается при остановке процесса: события из очереди либо отправляются, либо
+        # попадают в спул, иначе они пропали бы вместе с daemon-потоком отправителя
+        timeout = self.config.get("close_timeout", 10)
+        if self.sender is not None and self.sender.is_alive():
+            self.stopping.set()
+            try:
+                self.queue.put_nowait(_STOP)
+            except queue.Full:
+                pass
+            self.sender.join(timeout=timeout)
+            if self.sender.is_alive():
+                logger.warning(f"Отправитель Kafka не завершился за {timeout} с, очередь: {self.queue.qsize()}")
+            else:
+                self.sender = None
+        if self.sender is None:
+            self._spool_queue()
         if self.producer:
-            self.producer.close()
-            logger.info("Kafka producer закрыт")
+            try:
+                self.producer.flush(timeout=timeout)
+                self.producer.close(timeout=timeout)
+                logger.info("Kafka producer закрыт")
+            except Exception as e:
+                logger.error(f"Ошибка закрытия Kafka producer: {e}")
+            self.producer = None
+        if self.spool is not None:
+            self.spool.close()
+
+    def _spool_queue(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is _STOP:
+                continue
+            topic, message, key, _ = item
+            if not self._spool(topic, message, key):
+                self._count("failed")
 
 
 kafka_producer = KafkaMessageProducer()
+atexit.register(kafka_producer.close)
 
 
 def send_post_created_message(post_data: Dict[str, Any]) -> bool:
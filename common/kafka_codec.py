@@ -0,0 +1,126 @@
+import glob
+import json
+import logging
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable
+
+import msgpack
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+
+# 0xc1 не используется в msgpack и не может начинать JSON-документ
+MAGIC = 0xC1
+HEADER = struct.Struct(">BHB")
+SCHEMALESS_ID = 0
+FLAG_ZLIB = 0x01
+
+
+class EventSchemaRegistry:
+    def __init__(self, directory: str):
+        self.directory = str(directory)
+        self.by_id = {}
+        self.latest = {}
+        self.load()
+
+    def load(self):
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            with open(path, encoding="utf-8") as f:
+                schema = json.load(f)
+            schema["fields"] = tuple(schema["fields"])
+            schema["field_set"] = frozenset(schema["fields"])
+
+            if schema["id"] == SCHEMALESS_ID or schema["id"] in self.by_id:
+                raise ValueError(f"Недопустимый или повторяющийся id схемы {schema['id']} в {path}")
+            self.by_id[schema["id"]] = schema
+
+            current = self.latest.get(schema["event_type"])
+            if current is None or schema["version"] > current["version"]:
+                self.latest[schema["event_type"]] = schema
+
+    def get(self, schema_id: int) -> Dict[str, Any]:
+        try:
+            return self.by_id[schema_id]
+        except KeyError:
+            raise ValueError(f"Неизвестная схема события: {schema_id}")
+
+    def for_event(self, event_type: str) -> Dict[str, Any]:
+        return self.latest.get(event_type)
+
+
+class EventCodec:
+    def __init__(
+        self,
+        registry: EventSchemaRegistry,
+        format: str = FORMAT_MSGPACK,
+        compress_events: Iterable[str] = (),
+        compress_min_bytes: int = 512,
+        compression_level: int = 6,
+    ):
+        self.registry = registry
+        self.format = format
+        self.compress_events = frozenset(compress_events)
+        self.compress_min_bytes = compress_min_bytes
+        self.compression_level = compression_level
+
+    @staticmethod
+    def event_type(message: Dict[str, Any]) -> str:
+        return message.get("event_type") or message.get("type")
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        if self.format == FORMAT_JSON:
+            return json.dumps(message, ensure_ascii=False).encode("utf-8")
+
+        event_type = self.event_type(message)
+        schema = self.registry.for_event(event_type)
+        if schema is not None and schema["field_set"].issuperset(message):
+            schema_id = schema["id"]
+            payload = msgpack.packb([message.get(field) for field in schema["fields"]], use_bin_type=True)
+        else:
+            schema_id = SCHEMALESS_ID
+            payload = msgpack.packb(message, use_bin_type=True)
+
+        flags = 0
+        if event_type in self.compress_events and len(payload) >= self.compress_min_bytes:
+            compressed = zlib.compress(payload, self.compression_level)
+            if len(compressed) < len(payload):
+                payload = compressed
+                flags |= FLAG_ZLIB
+
+        return HEADER.pack(MAGIC, schema_id, flags) + payload
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        if not data or data[0] != MAGIC:
+            return json.loads(data.decode("utf-8"))
+
+        _, schema_id, flags = HEADER.unpack_from(data)
+        payload = data[HEADER.size:]
+        if flags & FLAG_ZLIB:
+            payload = zlib.decompress(payload)
+
+        value = msgpack.unpackb(payload, raw=False)
+        if schema_id == SCHEMALESS_ID:
+            return value
+        return dict(zip(self.registry.get(schema_id)["fields"], value))
+
+
+def build_event_codec(**overrides) -> EventCodec:
+    config = {**getattr(settings, "KAFKA_EVENT_CODEC", {}), **overrides}
+    registry = EventSchemaRegistry(
+        config.get("schema_dir", os.path.join(os.path.dirname(__file__), "event_schemas"))
+    )
+    return EventCodec(
+        registry,
+        format=config.get("format", FORMAT_MSGPACK),
+        compress_events=config.get("compress_events", ()),
+        compress_min_bytes=config.get("compress_min_bytes", 512),
+        compression_level=config.get("compression_level", 6),
+    )
+
+
+event_codec = build_event_codec()
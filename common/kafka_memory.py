@@ -0,0 +1,117 @@
+import threading
+import zlib
+from collections import defaultdict, namedtuple
+from typing import Any, Dict, List
+
+from kafka.errors import KafkaError
+from kafka.structs import TopicPartition
+
+MemoryRecord = namedtuple("MemoryRecord", ["topic", "partition", "offset", "key", "value"])
+
+
+class MemoryFuture:
+    """Уже завершенная отправка с интерфейсом FutureRecordMetadata из kafka-python."""
+
+    def __init__(self, record: MemoryRecord = None, exception: Exception = None):
+        self.record = record
+        self.exception = exception
+
+    def get(self, timeout=None) -> MemoryRecord:
+        if self.exception is not None:
+            raise self.exception
+        return self.record
+
+    def add_callback(self, fn, *args):
+        if self.exception is None:
+            fn(*args, self.record)
+        return self
+
+    def add_errback(self, fn, *args):
+        if self.exception is not None:
+            fn(*args, self.exception)
+        return self
+
+
+class InMemoryBroker:
+    def __init__(self, partitions: int = 1):
+        self.partitions = partitions
+        self.logs = defaultdict(list)
+        self.committed = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def publish(self, topic: str, value: Dict[str, Any], key: str = None) -> MemoryRecord:
+        partition = zlib.crc32(str(key).encode("utf-8")) % self.partitions if key is not None else 0
+        with self.lock:
+            log = self.logs[TopicPartition(topic, partition)]
+            record = MemoryRecord(topic, partition, len(log), key, value)
+            log.append(record)
+        return record
+
+    def consumer(self, topic: str, group_id: str, partitions: List[int] = None) -> "InMemoryConsumer":
+        return InMemoryConsumer(self, topic, group_id, partitions)
+
+    def producer(self) -> "InMemoryProducer":
+        return InMemoryProducer(self)
+
+    def values(self, topic: str) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [
+                record.value
+                for partition in range(self.partitions)
+                for record in self.logs[TopicPartition(topic, partition)]
+            ]
+
+
+class InMemoryProducer:
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+        # пока выставлен флаг, отправка завершается ошибкой, как при недоступном брокере
+        self.failing = False
+
+    def send(self, topic: str, value: Dict[str, Any] = None, key: str = None) -> MemoryFuture:
+        if self.failing:
+            return MemoryFuture(exception=KafkaError("Брокер недоступен"))
+        return MemoryFuture(self.broker.publish(topic, value, key))
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+
+class InMemoryConsumer:
+    def __init__(self, broker: InMemoryBroker, topic: str, group_id: str, partitions: List[int] = None):
+        self.broker = broker
+        self.group_id = group_id
+        self.assigned = [
+            TopicPartition(topic, partition)
+            for partition in (partitions if partitions is not None else range(broker.partitions))
+        ]
+        with broker.lock:
+            committed = broker.committed[group_id]
+            self.positions = {tp: committed.get(tp, 0) for tp in self.assigned}
+
+    def poll(self, timeout_ms: int = 0, max_records: int = 500) -> Dict[TopicPartition, List[MemoryRecord]]:
+        result = {}
+        remaining = max_records
+        with self.broker.lock:
+            for tp in self.assigned:
+                if remaining <= 0:
+                    break
+                records = self.broker.logs[tp][self.positions[tp]:self.positions[tp] + remaining]
+                if records:
+                    result[tp] = records
+                    self.positions[tp] += len(records)
+                    remaining -= len(records)
+        return result
+
+    def seek(self, partition: TopicPartition, offset: int):
+        self.positions[partition] = offset
+
+    def commit(self):
+        with self.broker.lock:
+            self.broker.committed[self.group_id].update(self.positions)
+
+    def close(self):
+        pass
@@ -0,0 +1,193 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессных блокировок нет, спул рассчитан на один процесс
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg"
+OFFSET_SUFFIX = ".offset"
+DRAIN_LOCK = ".drain.lock"
+
+
+def _try_lock(f) -> bool:
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class SegmentSpool:
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 8 * 1024 * 1024,
+        max_bytes: int = 256 * 1024 * 1024,
+        fsync_every: int = 100,
+        fsync_interval: float = 1.0,
+    ):
+        self.directory = str(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.writer = None
+        self.writer_name = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.dropped = 0
+
+    def _segments(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def size(self) -> int:
+        total = 0
+        for name in self._segments():
+            try:
+                total += os.path.getsize(self._path(name)) - self._read_offset(name)
+            except OSError:
+                pass
+        return total
+
+    def has_data(self) -> bool:
+        return self.size() > 0
+
+    def _sync(self):
+        if self.writer is not None and self.unsynced:
+            self.writer.flush()
+            os.fsync(self.writer.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _close_writer(self):
+        if self.writer is not None:
+            self._sync()
+            self.writer.close()
+            self.writer = None
+            self.writer_name = None
+
+    def _open_writer(self):
+        # Каталог общий для всех процессов: каждый пишет только в свои сегменты и держит
+        # на открытом сегменте flock, чтобы чужой drain не удалил его
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self._segments()
+        last = int(segments[-1].split("-")[0].removesuffix(SEGMENT_SUFFIX)) if segments else 0
+        name = f"{last + 1:012d}-{os.getpid()}{SEGMENT_SUFFIX}"
+        self.writer = open(self._path(name), "ab")
+        _try_lock(self.writer)
+        self.writer_name = name
+
+    def append(self, topic: str, value: Dict[str, Any], key: str = None) -> bool:
+        line = json.dumps({"topic": topic, "key": key, "value": value}, ensure_ascii=False).encode("utf-8") + b"\n"
+
+        with self.lock:
+            if self.size() + len(line) > self.max_bytes:
+                self.dropped += 1
+                logger.error("Спул Kafka переполнен, сообщение отброшено")
+                return False
+
+            if self.writer is None or self.writer.tell() >= self.segment_bytes:
+                self._close_writer()
+                self._open_writer()
+
+            self.writer.write(line)
+            # буфер сбрасывается сразу: size() и drain читают файл с диска; fsync остается пакетным
+            self.writer.flush()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+            return True
+
+    def _read_offset(self, name: str) -> int:
+        try:
+            with open(self._path(name) + OFFSET_SUFFIX, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, name: str, offset: int):
+        path = self._path(name) + OFFSET_SUFFIX
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _remove_segment(self, name: str):
+        for path in (self._path(name), self._path(name) + OFFSET_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def drain(self, send_batch: Callable[[List[Dict[str, Any]]], int], batch_size: int = 500) -> int:
+        with self.lock:
+            self._sync()
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(DRAIN_LOCK), "a") as drain_lock:
+                # Спул разбирает один процесс за раз, иначе события уйдут дважды
+                if not _try_lock(drain_lock):
+                    return 0
+                return self._drain_locked(send_batch, batch_size)
+
+    def _drain_locked(self, send_batch: Callable[[List[Dict[str, Any]]], int], batch_size: int) -> int:
+        drained = 0
+        for name in self._segments():
+            offset = self._read_offset(name)
+            with open(self._path(name), "rb") as f:
+                # Сегмент, в который еще пишет другой процесс, дочитываем, но не удаляем
+                owned_elsewhere = name != self.writer_name and not _try_lock(f)
+                f.seek(offset)
+                while True:
+                    records, ends = [], []
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        offset += len(line)
+                        try:
+                            records.append(json.loads(line))
+                            ends.append(offset)
+                        except ValueError:
+                            logger.error(f"Поврежденная запись в спуле Kafka {name}, пропускаю")
+                        if len(records) >= batch_size:
+                            break
+                    if not records:
+                        break
+
+                    sent = send_batch(records)
+                    drained += sent
+                    if sent < len(records):
+                        if sent:
+                            self._write_offset(name, ends[sent - 1])
+                        return drained
+                    self._write_offset(name, ends[-1])
+
+            if owned_elsewhere:
+                continue
+            if name != self.writer_name:
+                self._remove_segment(name)
+            elif self.writer is not None and self.writer.tell() == self._read_offset(name):
+                self._close_writer()
+                self._remove_segment(name)
+        return drained
+
+    def close(self):
+        with self.lock:
+            self._close_writer()
@@ -0,0 +1,111 @@
+import gzip
+import random
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from common.kafka_codec import FORMAT_JSON, FORMAT_MSGPACK, build_event_codec
+
+
+class Command(BaseCommand):
+    help = "Сравнение кодирования событий Kafka: JSON и бинарный формат со схемами"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=20000, help="Количество событий каждого типа")
+        parser.add_argument("--text-length", type=int, default=400, help="Длина текста поста в событии")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "KAFKA_PRODUCER_CONFIG", {}).get("batch_size", 64 * 1024),
+            help="Размер пакета producer'а, который сжимается gzip целиком, байт"
+        )
+
+    def sample_events(self, count, text_length):
+        words = "пример текста комментария с <code>разметкой</code> и ссылками на django kafka поиск".split()
+        rng = random.Random(0)
+
+        def text():
+            # разные тексты, иначе gzip пакета сжимает повторы и результат завышен
+            return " ".join(rng.choice(words) for _ in range(text_length // 6))[:text_length]
+
+        now = datetime.now().isoformat()
+        post_created = [
+            {
+                "event_type": "post_created",
+                "post_id": 100000 + i,
+                "username": f"user{i % 500}",
+                "email": f"user{i % 500}@example.com",
+                "text": text(),
+                "timestamp": now,
+                "has_image": i % 3 == 0,
+                "has_text_file": False,
+                "parent_post_id": 99999 + i if i % 2 else None,
+            }
+            for i in range(count)
+        ]
+        search_query = [
+            {
+                "type": "search_query",
+                "query": f"django elasticsearch {i % 50}",
+                "filters": {"username": f"user{i % 500}"} if i % 4 == 0 else None,
+                "results_count": i % 37,
+                "timestamp": now,
+            }
+            for i in range(count)
+        ]
+        return {"post_created": post_created, "search_query": search_query}
+
+    def batch_compressed_size(self, encoded, batch_size):
+        # producer сжимает пакет сообщений целиком, а не каждое событие отдельно
+        total = 0
+        batch = []
+        batch_bytes = 0
+        for data in encoded:
+            if batch and batch_bytes + len(data) > batch_size:
+                total += len(gzip.compress(b"".join(batch)))
+                batch = []
+                batch_bytes = 0
+            batch.append(data)
+            batch_bytes += len(data)
+        if batch:
+            total += len(gzip.compress(b"".join(batch)))
+        return total
+
+    def measure(self, codec, events, batch_size):
+        started = time.perf_counter()
+        encoded = [codec.encode(event) for event in events]
+        encode_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for data in encoded:
+            codec.decode(data)
+        decode_seconds = time.perf_counter() - started
+
+        return (
+            sum(len(data) for data in encoded) / len(events),
+            self.batch_compressed_size(encoded, batch_size) / len(events),
+            encode_seconds / len(events) * 1_000_000,
+            decode_seconds / len(events) * 1_000_000,
+        )
+
+    def handle(self, *args, **options):
+        codecs = (
+            ("json", build_event_codec(format=FORMAT_JSON)),
+            ("msgpack", build_event_codec(format=FORMAT_MSGPACK, compress_events=())),
+            ("msgpack+zlib", build_event_codec(
+                format=FORMAT_MSGPACK,
+                compress_events=("post_created", "search_query"),
+                compress_min_bytes=0,
+            )),
+        )
+
+        for event_type, events in self.sample_events(options["events"], options["text_length"]).items():
+            self.stdout.write(f"{event_type}: {len(events)} событий")
+            for label, codec in codecs:
+                size, gzip_size, encode_us, decode_us = self.measure(codec, events, options["batch_size"])
+                self.stdout.write(
+                    f"  {label}: {size:.1f} байт на событие, {gzip_size:.1f} в пакете gzip, "
+                    f"кодирование {encode_us:.2f} мкс, декодирование {decode_us:.2f} мкс"
+                )
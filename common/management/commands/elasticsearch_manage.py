@@ -1,11 +1,11 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 import logging
 
 ELASTICSEARCH_AVAILABLE = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
 
 if ELASTICSEARCH_AVAILABLE:
-    from django_elasticsearch_dsl.management.commands import search_index_command
+    from django.core.management import call_command
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +17,7 @@ if ELASTICSEARCH_AVAILABLE:
         def add_arguments(self, parser):
             parser.add_argument(
                 "action",
-                choices=["create", "delete", "rebuild", "update"],
+                choices=["create", "delete", "rebuild", "update", "reindex"],
                 help="Действие для выполнения"
             )
             parser.add_argument(
@@ -30,6 +30,50 @@ if ELASTICSEARCH_AVAILABLE:
                 action="store_true",
                 help="Принудительное выполнение"
             )
+            parser.add_argument(
+                "--range-size",
+                type=int,
+                default=10000,
+                help="Размер диапазона id для reindex"
+            )
+            parser.add_argument(
+                "--batch-size",
+                type=int,
+                default=500,
+                help="Размер пакета bulk-запроса для reindex"
+            )
+            parser.add_argument(
+                "--workers",
+                type=int,
+                default=None,
+                help="Количество процессов сериализации для reindex"
+            )
+            parser.add_argument(
+                "--threads",
+                type=int,
+                default=4,
+                help="Количество параллельных bulk-запросов для reindex"
+            )
+            parser.add_argument(
+                "--max-in-flight",
+                type=int,
+                default=8,
+                help="Максимум пакетов в очереди на отправку для reindex"
+            )
+            parser.add_argument(
+                "--checkpoint",
+                help="Файл контрольной точки для reindex"
+            )
+            parser.add_argument(
+                "--resume",
+                action="store_true",
+                help="Продолжить reindex с контрольной точки"
+            )
+            parser.add_argument(
+                "--keep-old",
+                action="store_true",
+                help="Не удалять предыдущий индекс после переключения алиаса"
+            )
 
         def handle(self, *args, **options):
             action = options["action"]
@@ -44,9 +88,11 @@ if ELASTICSEARCH_AVAILABLE:
                 elif action == "delete":
                     self.delete_indexes(models, force)
                 elif action == "rebuild":
-                    self.rebuild_indexes(models, force)
+                    self.rebuild_indexes(models, force, options)
                 elif action == "update":
                     self.update_indexes(models, force)
+                elif action == "reindex":
+                    self.reindex(options)
 
                 self.stdout.write(
                     self.style.SUCCESS(f"Действие \"{action}\" выполнено успешно")
@@ -70,7 +116,7 @@ if ELASTICSEARCH_AVAILABLE:
                         self.stdout.write(f"Модель {model} не найдена в registry")
             else:
                 self.stdout.write("Создаю все индексы...")
-                search_index_command.Command().handle(action="create")
+                call_command("search_index", "--create", "-f")
 
         def delete_indexes(self, models, force):
             if not force:
@@ -90,20 +136,66 @@ if ELASTICSEARCH_AVAILABLE:
                         self.stdout.write(f"Модель {model} не найдена в registry")
             else:
                 self.stdout.write("Удаляю все индексы...")
-                search_index_command.Command().handle(action="delete")
+                call_command("search_index", "--delete", "-f")
 
-        def rebuild_indexes(self, models, force):
-            self.stdout.write("Пересоздаю индексы...")
-            self.delete_indexes(models, True)
-            self.create_indexes(models, force)
-            
-            if not models:
-                self.stdout.write("Обновляю данные...")
-                search_index_command.Command().handle(action="update")
+        def rebuild_indexes(self, models, force, options):
+            if models:
+                self.stdout.write("Пересоздаю индексы...")
+                self.delete_indexes(models, True)
+                self.create_indexes(models, force)
+                return
+
+            from posts.search_reindex import blue_green_rebuild
+
+            if options["checkpoint"] or options["resume"]:
+                raise CommandError("--checkpoint и --resume применимы только к reindex: rebuild строит новый индекс целиком")
+
+            self.stdout.write("Строю новый индекс постов за алиасом...")
+            result = blue_green_rebuild(
+                keep_old=options["keep_old"],
+                progress=self.report_progress,
+                **self.batch_options(options),
+            )
+            self.stdout.write(
+                f"Индекс {result['index']} заполнен: {result['indexed']} документов "
+                f"({result['docs_per_second']:.0f} док/с), догнано изменений: {result['caught_up']}"
+            )
+            if result["old_indices"]:
+                state = "оставлены" if options["keep_old"] else "удалены"
+                self.stdout.write(f"Предыдущие индексы {state}: {', '.join(result['old_indices'])}")
 
         def update_indexes(self, models, force):
             self.stdout.write("Обновляю данные в индексах...")
-            search_index_command.Command().handle(action="update")
+            call_command("search_index", "--populate")
+
+        def report_progress(self, last_id, indexed, errors, rate):
+            self.stdout.write(f"id <= {last_id}: проиндексировано {indexed}, ошибок {errors}, {rate:.0f} док/с")
+
+        def batch_options(self, options):
+            return {
+                "range_size": options["range_size"],
+                "batch_size": options["batch_size"],
+                "workers": options["workers"],
+                "threads": options["threads"],
+                "max_in_flight": options["max_in_flight"],
+            }
+
+        def reindex_options(self, options):
+            return dict(
+                self.batch_options(options),
+                checkpoint=options["checkpoint"],
+                resume=options["resume"],
+            )
+
+        def reindex(self, options):
+            from posts.search_reindex import reindex_posts
+
+            self.stdout.write("Параллельная переиндексация постов...")
+            result = reindex_posts(progress=self.report_progress, **self.reindex_options(options))
+            self.stdout.write(
+                f"Проиндексировано {result['indexed']} документов за {result['seconds']:.1f} с "
+                f"({result['docs_per_second']:.0f} док/с), ошибок: {result['errors']}"
+            )
 else:
     class Command(BaseCommand):
         help = "Elasticsearch недоступен"
@@ -0,0 +1,57 @@
+import json
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Вывод метрик Kafka producer и Elasticsearch работающего сервера"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="http://localhost:8000/metrics/",
+            help="Адрес endpoint метрик"
+        )
+        parser.add_argument(
+            "--token",
+            default=getattr(settings, "METRICS_TOKEN", ""),
+            help="Токен доступа к метрикам"
+        )
+        parser.add_argument(
+            "--watch",
+            type=float,
+            default=0,
+            help="Обновлять вывод каждые N секунд"
+        )
+
+    def fetch(self, url, token):
+        request = urllib.request.Request(url)
+        if token:
+            request.add_header("Authorization", f"Bearer {token}")
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except Exception as e:
+            raise CommandError(f"Не удалось получить метрики с {url}: {e}")
+
+    def show(self, snapshot):
+        for name, value in sorted(snapshot["counters"].items()):
+            self.stdout.write(f"{name}: {value}")
+        for name, value in sorted(snapshot["gauges"].items()):
+            self.stdout.write(f"{name}: {value}")
+        for name, histogram in sorted(snapshot["histograms"].items()):
+            self.stdout.write(
+                f"{name}: count={histogram['count']} avg={histogram['avg']} "
+                f"p50<={histogram['p50']} p95<={histogram['p95']} p99<={histogram['p99']}"
+            )
+
+    def handle(self, *args, **options):
+        while True:
+            self.show(self.fetch(options["url"], options["token"]))
+            if not options["watch"]:
+                break
+            time.sleep(options["watch"])
+            self.stdout.write("")
@@ -0,0 +1,181 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Tuple
+
+DEFAULT_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _labels_key(labels: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Tuple, extra: Tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, value: int = 1):
+        with self.lock:
+            self.value += value
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe((time.perf_counter() - started) * 1000)
+
+    def quantile(self, q: float) -> float:
+        with self.lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self):
+        with self.lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        return {
+            "count": total,
+            "sum": round(value_sum, 3),
+            "avg": round(value_sum / total, 3) if total else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], counts)),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, **labels) -> Counter:
+        key = (name, _labels_key(labels))
+        with self.lock:
+            if key not in self.counters:
+                self.counters[key] = Counter()
+            return self.counters[key]
+
+    def histogram(self, name: str, buckets=DEFAULT_LATENCY_BUCKETS_MS, **labels) -> Histogram:
+        key = (name, _labels_key(labels))
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            return self.histograms[key]
+
+    def gauge(self, name: str, read: Callable[[], float], **labels):
+        with self.lock:
+            self.gauges[(name, _labels_key(labels))] = read
+
+    def _read_gauges(self):
+        with self.lock:
+            gauges = list(self.gauges.items())
+        values = {}
+        for key, read in gauges:
+            try:
+                values[key] = read()
+            except Exception:
+                values[key] = None
+        return values
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            counters = list(self.counters.items())
+            histograms = list(self.histograms.items())
+
+        def label(name, labels):
+            return name + _format_labels(labels)
+
+        return {
+            "counters": {label(*key): counter.snapshot() for key, counter in counters},
+            "gauges": {label(*key): value for key, value in self._read_gauges().items()},
+            "histograms": {label(*key): histogram.snapshot() for key, histogram in histograms},
+        }
+
+    def render_text(self) -> str:
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        lines = []
+        for (name, labels), counter in counters:
+            lines.append(f"{name}{_format_labels(labels)} {counter.snapshot()}")
+        for (name, labels), value in sorted(self._read_gauges().items()):
+            if value is not None:
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            with histogram.lock:
+                counts, total, value_sum = list(histogram.counts), histogram.count, histogram.sum
+            cumulative = 0
+            for bound, count in zip([str(bound) for bound in histogram.buckets] + ["+Inf"], counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_count{_format_labels(labels)} {total}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value_sum}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def elasticsearch_call(operation: str):
+    metrics.counter("elasticsearch_requests_total", operation=operation).inc()
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if "Timeout" in type(e).__name__:
+            metrics.counter("elasticsearch_timeouts_total", operation=operation).inc()
+        else:
+            metrics.counter("elasticsearch_errors_total", operation=operation).inc()
+        raise
+    finally:
+        metrics.histogram("elasticsearch_request_latency_ms", operation=operation).observe(
+            (time.perf_counter() - started) * 1000
+        )
+
+
+def record_elasticsearch_response(operation: str, response):
+    metrics.counter("elasticsearch_hits_total", operation=operation).inc(len(response.hits))
+    if getattr(response, "timed_out", False):
+        metrics.counter("elasticsearch_timeouts_total", operation=operation).inc()
@@ -0,0 +1,118 @@
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from common.kafka_client import KafkaMessageProducer
+from common.kafka_memory import InMemoryBroker
+
+TOPIC = "posts"
+
+
+class KafkaProducerTests(SimpleTestCase):
+    def build_producer(self, **config):
+        spool_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spool_dir.cleanup)
+        with override_settings(
+            KAFKA_PRODUCER_CONFIG=dict({"async": False, "close_timeout": 5}, **config),
+            KAFKA_SPOOL_CONFIG={"directory": spool_dir.name, "replay_interval": 0},
+        ):
+            producer = KafkaMessageProducer()
+        self.addCleanup(producer.close)
+        self.broker = InMemoryBroker()
+        producer.producer = self.broker.producer()
+        return producer
+
+    def event(self, post_id):
+        return {"event_type": "post_created", "post_id": post_id}
+
+    def test_sync_send_publishes_event(self):
+        producer = self.build_producer()
+
+        self.assertTrue(producer.send_message(TOPIC, self.event(1), key="1"))
+
+        self.assertEqual(self.broker.values(TOPIC), [self.event(1)])
+
+    def test_failed_send_is_spooled_and_replayed_before_new_events(self):
+        producer = self.build_producer()
+        producer.producer.failing = True
+        self.assertFalse(producer.send_message(TOPIC, self.event(1), key="1"))
+        self.assertEqual(producer.get_stats()["spooled"], 1)
+
+        producer.producer.failing = False
+        self.assertTrue(producer.send_message(TOPIC, self.event(2), key="2"))
+
+        self.assertEqual(self.broker.values(TOPIC), [self.event(1), self.event(2)])
+        self.assertEqual(producer.get_stats()["spool_bytes"], 0)
+
+    def test_sync_send_waits_behind_unreplayed_spool(self):
+        producer = self.build_producer()
+        producer.producer.failing = True
+        producer.send_message(TOPIC, self.event(1), key="1")
+        producer.producer.failing = False
+        producer.next_replay = time.monotonic() + 60
+
+        self.assertFalse(producer.send_message(TOPIC, self.event(2), key="2"))
+        self.assertEqual(self.broker.values(TOPIC), [])
+
+        producer.next_replay = 0.0
+        producer.send_message(TOPIC, self.event(3), key="3")
+        self.assertEqual(self.broker.values(TOPIC), [self.event(1), self.event(2), self.event(3)])
+
+    def test_close_does_not_hang_when_stop_marker_is_evicted(self):
+        producer = self.build_producer(**{"async": True, "queue_size": 1, "overflow_policy": "drop_oldest"})
+        gate = threading.Event()
+        send = producer.producer.send
+
+        def blocking_send(*args, **kwargs):
+            gate.wait(5)
+            return send(*args, **kwargs)
+
+        producer.producer.send = blocking_send
+        producer.send_message(TOPIC, self.event(0), key="0")
+        while not producer.queue.empty():
+            time.sleep(0.01)
+
+        closing = threading.Thread(target=producer.close)
+        closing.start()
+        while producer.queue.empty():
+            time.sleep(0.01)
+        # новое событие вытесняет маркер остановки из полной очереди
+        producer.send_message(TOPIC, self.event(1), key="1")
+        gate.set()
+
+        started = time.monotonic()
+        closing.join(5)
+        self.assertFalse(closing.is_alive())
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.broker.values(TOPIC), [self.event(0), self.event(1)])
+
+    def test_async_close_delivers_queued_events(self):
+        producer = self.build_producer(**{"async": True})
+
+        for post_id in range(5):
+            producer.send_message(TOPIC, self.event(post_id), key=str(post_id))
+        producer.close()
+
+        self.assertEqual(self.broker.values(TOPIC), [self.event(post_id) for post_id in range(5)])
+
+
+class MetricsAccessTests(TestCase):
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_denied_without_token_or_staff(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/circuit-breakers/").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_allowed_with_token(self):
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_allowed_for_staff(self):
+        staff = get_user_model().objects.create_user("admin", password="password", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get("/metrics/").status_code, 200)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from common.views import circuit_breakers_view, metrics_view
+
+urlpatterns = [
+    path("metrics/", metrics_view, name="metrics"),
+    path("metrics/circuit-breakers/", circuit_breakers_view, name="circuit_breakers"),
+]
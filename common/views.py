@@ -0,0 +1,36 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_GET
+
+from common.circuit_breaker import circuit_breakers
+from common.metrics import metrics
+
+
+def _authorized(request):
+    # Без токена метрики видны только персоналу
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        provided = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if hmac.compare_digest(provided, token):
+            return True
+    user = getattr(request, "user", None)
+    return bool(user and user.is_staff)
+
+
+@require_GET
+def metrics_view(request):
+    if not _authorized(request):
+        return HttpResponseForbidden()
+
+    if request.GET.get("format") == "prometheus":
+        return HttpResponse(metrics.render_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    return JsonResponse(metrics.snapshot())
+
+
+@require_GET
+def circuit_breakers_view(request):
+    if not _authorized(request):
+        return HttpResponseForbidden()
+    return JsonResponse({name: breaker.snapshot() for name, breaker in circuit_breakers.items()})
@@ -2,10 +2,12 @@ import graphene
 from graphene_django import DjangoObjectType
 from django.contrib.auth.models import User
 from posts.models import Post
+from posts.local_search import local_search_enabled, local_search_index
 from django.db.models import Q
 from graphql import GraphQLError
 from django.core.exceptions import PermissionDenied
 from .jwt_utils import create_jwt_token, get_user_from_context, require_auth
+from .search_batch import SEARCH_AGGREGATIONS, search_batch, selected_subfields
 
 
 class UserType(DjangoObjectType):
@@ -32,15 +34,18 @@ class AuthenticatedUserType(DjangoObjectType):
 class PostType(DjangoObjectType):
     timestamp = graphene.DateTime(source="timestamp")
     parent_post = graphene.Field("graphql_app.schema.PostType", source="parent_post")
+    replies = graphene.List("graphql_app.schema.PostType")
     
     class Meta:
         model = Post
-        fields = ("id", "text", "username", "email", "image", "text_file")
+        fields = ("id", "text", "username", "email", "image", "text_file", "reply_count", "last_reply_at", "depth")
 
     def resolve_parent_post(self, info):
         return self.parent_post
 
     def resolve_replies(self, info):
+        if not self.reply_count:
+            return []
         return Post.objects.filter(parent_post=self)
 
 
@@ -88,8 +93,10 @@ class ElasticsearchSearchResult(graphene.ObjectType):
     hits = graphene.List(ElasticsearchHitType)
     total = graphene.Int()
     aggregations = graphene.Field(ElasticsearchAggregationType)
+    next_cursor = graphene.String()
     query = graphene.String()
     filters = graphene.JSONString()
+    degraded = graphene.Boolean()
 
 
 class SearchStatistics(graphene.ObjectType):
@@ -123,7 +130,8 @@ class Query(graphene.ObjectType):
                                         query=graphene.String(),
                                         size=graphene.Int(),
                                         from_=graphene.Int(),
-                                        filters=graphene.JSONString())
+                                        filters=graphene.JSONString(),
+                                        after=graphene.String())
     
     search_suggestions = graphene.List(graphene.String, query=graphene.String(required=True))
     
@@ -164,7 +172,10 @@ class Query(graphene.ObjectType):
         posts = Post.objects.all().order_by("-timestamp")
         
         if search:
-            posts = posts.filter(text__icontains=search)
+            if local_search_enabled():
+                posts = local_search_index.filter_queryset(posts, search)
+            else:
+                posts = posts.filter(text__icontains=search)
         if author_id:
             posts = posts.filter(username__icontains=author_id)
         if parent_post_id:
@@ -190,7 +201,9 @@ class Query(graphene.ObjectType):
 
     def resolve_post_comments(self, info, post_id):
         try:
-            Post.objects.get(pk=post_id)
+            post = Post.objects.only("reply_count").get(pk=post_id)
+            if not post.reply_count:
+                return []
             return Post.objects.filter(parent_post_id=post_id).order_by("timestamp")
         except Post.DoesNotExist:
             raise GraphQLError(f"Пост с ID {post_id} не найден")
@@ -199,6 +212,9 @@ class Query(graphene.ObjectType):
         if not query or len(query.strip()) < 2:
             raise GraphQLError("Поисковый запрос должен содержать минимум 2 символа")
         
+        if local_search_enabled():
+            return local_search_index.filter_queryset(Post.objects.all(), query).order_by("-timestamp")
+
         return Post.objects.filter(
             Q(text__icontains=query) |
             Q(username__icontains=query)
@@ -220,15 +236,14 @@ class Query(graphene.ObjectType):
             raise GraphQLError("Требуется аутентификация")
         return user
     
-    def resolve_elasticsearch_search(self, info, query=None, size=20, from_=0, filters=None):
+    def resolve_elasticsearch_search(self, info, query=None, size=20, from_=0, filters=None, after=None):
         try:
-            from django.conf import settings
-            elasticsearch_available = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
-            if not elasticsearch_available:
-                raise GraphQLError("Elasticsearch недоступен")
-                
             from posts.search_service import post_search_service
-            result = post_search_service.search_posts(query, size, from_, filters)
+            batch = search_batch(info)
+            result = batch.result(info.path.key) if batch else None
+            if result is None:
+                aggregations = selected_subfields(info, "aggregations") & SEARCH_AGGREGATIONS
+                result = post_search_service.search_posts(query, size, from_, filters, after, aggregations)
             
             if "error" in result:
                 raise GraphQLError(result["error"])
@@ -239,25 +254,22 @@ class Query(graphene.ObjectType):
     
     def resolve_search_suggestions(self, info, query):
         try:
-            from django.conf import settings
-            elasticsearch_available = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
-            if not elasticsearch_available:
-                raise GraphQLError("Elasticsearch недоступен")
-                
             from posts.search_service import post_search_service
-            return post_search_service.suggest_posts(query)
+            batch = search_batch(info)
+            suggestions = batch.result(info.path.key) if batch else None
+            if suggestions is None:
+                suggestions = post_search_service.suggest_posts(query)
+            return suggestions
         except Exception as e:
             raise GraphQLError(f"Ошибка автодополнения: {str(e)}")
     
     def resolve_search_statistics(self, info):
         try:
-            from django.conf import settings
-            elasticsearch_available = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
-            if not elasticsearch_available:
-                raise GraphQLError("Elasticsearch недоступен")
-                
             from posts.search_service import post_search_service
-            return post_search_service.get_search_statistics()
+            result = post_search_service.get_search_statistics()
+            if "error" in result:
+                raise GraphQLError(result["error"])
+            return result
         except Exception as e:
             raise GraphQLError(f"Ошибка получения статистики: {str(e)}")
 
@@ -0,0 +1,104 @@
+import logging
+
+from graphql import FieldNode, FragmentSpreadNode
+from graphql.execution.collect_fields import should_include_node
+from graphql.execution.values import get_argument_values
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELD = "elasticsearchSearch"
+SUGGESTIONS_FIELD = "searchSuggestions"
+SEARCH_AGGREGATIONS = {"usernames", "dates"}
+
+
+def iter_selected_fields(selection_set, fragments, variable_values=None):
+    if selection_set is None:
+        return
+    for selection in selection_set.selections:
+        if variable_values is not None and not should_include_node(variable_values, selection):
+            continue
+        if isinstance(selection, FieldNode):
+            yield selection
+        elif isinstance(selection, FragmentSpreadNode):
+            yield from iter_selected_fields(fragments[selection.name.value].selection_set, fragments, variable_values)
+        else:
+            yield from iter_selected_fields(selection.selection_set, fragments, variable_values)
+
+
+def nodes_subfields(nodes, field_name, fragments):
+    subfields = set()
+    for node in nodes:
+        for field in iter_selected_fields(node.selection_set, fragments):
+            if field.name.value == field_name:
+                subfields.update(sub.name.value for sub in iter_selected_fields(field.selection_set, fragments))
+    return subfields
+
+
+def selected_subfields(info, field_name):
+    return nodes_subfields(info.field_nodes, field_name, info.fragments)
+
+
+class SearchBatch:
+    """Поисковые поля корня операции, собранные заранее и выполненные одним _msearch."""
+
+    def __init__(self, info):
+        self.searches = {}
+        self.suggestions = {}
+        self.results = None
+
+        root_fields = info.schema.query_type.fields
+        for field in iter_selected_fields(info.operation.selection_set, info.fragments, info.variable_values):
+            key = field.alias.value if field.alias else field.name.value
+            if field.name.value == SEARCH_FIELD:
+                args = get_argument_values(root_fields[SEARCH_FIELD], field, info.variable_values)
+                self.searches[key] = {
+                    "query": args.get("query"),
+                    "size": args.get("size", 20),
+                    "from_": args.get("from_", 0),
+                    "filters": args.get("filters"),
+                    "after": args.get("after"),
+                    "aggregations": nodes_subfields([field], "aggregations", info.fragments) & SEARCH_AGGREGATIONS,
+                }
+            elif field.name.value == SUGGESTIONS_FIELD:
+                args = get_argument_values(root_fields[SUGGESTIONS_FIELD], field, info.variable_values)
+                self.suggestions[key] = {"query": args.get("query"), "size": 5}
+
+    def __len__(self):
+        return len(self.searches) + len(self.suggestions)
+
+    def _execute(self):
+        from posts.search_service import post_search_service
+
+        self.results = {}
+        try:
+            search_results, suggestion_results = post_search_service.multi_search(
+                list(self.searches.values()), list(self.suggestions.values())
+            )
+        except Exception as e:
+            logger.error(f"Ошибка пакетного поиска: {e}")
+            return
+        self.results.update(zip(self.searches, search_results))
+        self.results.update(zip(self.suggestions, suggestion_results))
+
+    def result(self, key):
+        # одиночное поле выгоднее отдать обычному пути с single-flight кешем
+        if len(self) < 2:
+            return None
+        if self.results is None:
+            self._execute()
+        return self.results.get(key)
+
+
+def search_batch(info):
+    batches = getattr(info.context, "_search_batches", None)
+    if batches is None:
+        batches = {}
+        try:
+            setattr(info.context, "_search_batches", batches)
+        except AttributeError:
+            # без контекста запроса негде хранить результаты - поля выполняются по одному
+            return None
+    batch = batches.get(id(info.operation))
+    if batch is None:
+        batch = batches[id(info.operation)] = SearchBatch(info)
+    return batch
@@ -1,7 +1,9 @@
 from django.conf import settings
 from .models import Post
+from .suggestions import suggest_inputs
 
 ELASTICSEARCH_AVAILABLE = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
+ELASTICSEARCH_REFRESH_INTERVAL = getattr(settings, 'ELASTICSEARCH_REFRESH_INTERVAL', "5s")
 
 if ELASTICSEARCH_AVAILABLE:
     from django_elasticsearch_dsl import Document, fields
@@ -11,17 +13,23 @@ if ELASTICSEARCH_AVAILABLE:
 if ELASTICSEARCH_AVAILABLE:
     @registry.register_document
     class PostDocument(Document):
-        username = fields.TextField()
-        email = fields.TextField()
+        # .raw - keyword с doc values для term-фильтров, сортировки и агрегаций
+        username = fields.TextField(fields={"raw": fields.KeywordField()})
+        email = fields.TextField(fields={"raw": fields.KeywordField()})
         text = fields.TextField()
         timestamp = fields.DateField()
         parent_post_id = fields.IntegerField(attr="parent_post_id")
+        suggest = fields.CompletionField()
         
         class Index:
             name = "posts"
             settings = {
                 "number_of_shards": 1,
-                "number_of_replicas": 0
+                "number_of_replicas": 0,
+                "refresh_interval": ELASTICSEARCH_REFRESH_INTERVAL,
+                # Задается только при создании индекса, см. elasticsearch_manage rebuild
+                "sort.field": ["timestamp", "id"],
+                "sort.order": ["desc", "desc"],
             }
         
         class Django:
@@ -38,8 +46,5 @@ if ELASTICSEARCH_AVAILABLE:
         def get_indexing_queryset(self):
             return self.get_queryset().select_related("parent_post")
         
-        @property
-        def parent_post_id(self):
-            if self.parent_post:
-                return self.parent_post.id
-            return None
+        def prepare_suggest(self, instance):
+            return suggest_inputs(instance)
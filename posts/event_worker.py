@@ -0,0 +1,117 @@
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from kafka.structs import TopicPartition
+
+from posts.image_processing import IMAGE_STATUS_PENDING, process_image
+from posts.models import Post, SearchOutboxEntry
+
+logger = logging.getLogger(__name__)
+
+POST_CREATED = "post_created"
+
+
+class PostEventWorker:
+    def __init__(self, consumer, batch_size=500, poll_timeout_ms=1000, index=True, process_media=True):
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.poll_timeout_ms = poll_timeout_ms
+        self.index = index and getattr(settings, "ELASTICSEARCH_AVAILABLE", False)
+        # В режиме "pool" изображения обрабатывает пул веб-сервера, повторная обработка не нужна
+        self.process_media = process_media and getattr(settings, "POSTS_IMAGE_PROCESSING", "pool") == "consumer"
+
+    def poll(self):
+        polled = self.consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        return [record for records in polled.values() for record in records]
+
+    def post_ids(self, records):
+        post_ids = []
+        for record in records:
+            value = record.value or {}
+            if value.get("event_type") == POST_CREATED and value.get("post_id") is not None:
+                post_ids.append(int(value["post_id"]))
+        return list(dict.fromkeys(post_ids))
+
+    def index_posts(self, post_ids):
+        from common.circuit_breaker import elasticsearch_breaker
+        from posts.search_outbox import send_bulk
+
+        # Записи outbox по этим постам остаются необработанными, их применит relay после восстановления
+        if not elasticsearch_breaker.allow():
+            logger.warning(f"Elasticsearch недоступен, индексация {len(post_ids)} постов отложена в outbox")
+            return
+
+        # Записи outbox фиксируются до чтения постов: запись, созданная позже (правка или
+        # удаление после чтения), остается необработанной и достается relay
+        pending_entries = list(
+            SearchOutboxEntry.objects.filter(
+                post_id__in=post_ids,
+                action=SearchOutboxEntry.ACTION_INDEX,
+                processed_at__isnull=True,
+            ).values_list("id", "post_id")
+        )
+
+        # Ненайденный пост не удаляем из индекса: его запись outbox не тронута, и relay
+        # применит ее, когда пост станет виден (или удалит пост по записи об удалении)
+        visible = set(Post.objects.filter(id__in=post_ids).values_list("id", flat=True))
+        missing = [post_id for post_id in post_ids if post_id not in visible]
+        if missing:
+            logger.warning(f"Посты {missing} не найдены, их индексацию выполнит relay outbox")
+        post_ids = [post_id for post_id in post_ids if post_id in visible]
+        if not post_ids:
+            return
+
+        latest = {post_id: SearchOutboxEntry(post_id=post_id, action=SearchOutboxEntry.ACTION_INDEX) for post_id in post_ids}
+        with elasticsearch_breaker.measure():
+            failed = send_bulk(latest)
+        if failed:
+            raise RuntimeError(f"Не удалось проиндексировать посты {sorted(failed)}")
+
+        indexed_entry_ids = [entry_id for entry_id, post_id in pending_entries if post_id in visible]
+        SearchOutboxEntry.objects.filter(id__in=indexed_entry_ids).update(processed_at=timezone.now())
+
+    def process_images(self, post_ids):
+        pending = (
+            Post.objects.filter(id__in=post_ids, image_status=IMAGE_STATUS_PENDING)
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        for image_name in pending:
+            process_image(image_name)
+
+    def rewind(self, records):
+        first_offsets = {}
+        for record in records:
+            tp = TopicPartition(record.topic, record.partition)
+            first_offsets[tp] = min(first_offsets.get(tp, record.offset), record.offset)
+        for tp, offset in first_offsets.items():
+            self.consumer.seek(tp, offset)
+
+    def process_batch(self):
+        records = self.poll()
+        if not records:
+            return 0
+
+        try:
+            post_ids = self.post_ids(records)
+            if post_ids:
+                if self.index:
+                    self.index_posts(post_ids)
+                if self.process_media:
+                    self.process_images(post_ids)
+        except Exception:
+            self.rewind(records)
+            raise
+
+        self.consumer.commit()
+        return len(records)
+
+    def run(self, stop=None):
+        while not (stop and stop.is_set()):
+            try:
+                self.process_batch()
+            except Exception as e:
+                logger.error(f"Ошибка обработки пакета событий Kafka: {e}")
+                if stop:
+                    stop.wait(self.poll_timeout_ms / 1000)
@@ -0,0 +1,180 @@
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from PIL import Image
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections
+from django.utils import timezone
+
+from common.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+IMAGE_STATUS_PENDING = "pending"
+IMAGE_STATUS_READY = "ready"
+IMAGE_STATUS_FAILED = "failed"
+
+IMAGE_VARIANTS = {
+    "thumbnail": (320, 240, None),
+    "320w": (320, 240, "WEBP"),
+    "640w": (640, 480, "WEBP"),
+    "1280w": (1280, 960, "WEBP"),
+}
+
+VARIANTS_DIR = "variants"
+
+ORIGINAL_MAX_SIZE = (1280, 960)
+
+
+def downscale_upload(upload, max_size=ORIGINAL_MAX_SIZE):
+    upload.seek(0)
+    with Image.open(upload) as img:
+        image_format = img.format
+        if (img.width <= max_size[0] and img.height <= max_size[1]) or getattr(img, "is_animated", False):
+            upload.seek(0)
+            return None
+
+        if image_format == "JPEG":
+            img.draft("RGB", max_size)
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        buffer = io.BytesIO()
+        save_kwargs = {"quality": 90, "optimize": True} if image_format == "JPEG" else {}
+        img.save(buffer, image_format, **save_kwargs)
+
+    buffer.seek(0)
+    return File(buffer, name=os.path.basename(upload.name))
+
+
+def generate_image_variants(media_root, image_name, variants=IMAGE_VARIANTS):
+    source_path = os.path.join(media_root, image_name)
+    stem, ext = os.path.splitext(image_name)
+    os.makedirs(os.path.dirname(os.path.join(media_root, VARIANTS_DIR, stem)), exist_ok=True)
+
+    result = {}
+    with Image.open(source_path) as source:
+        source.load()
+        for name, (max_width, max_height, image_format) in variants.items():
+            img = source.copy()
+            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+            if image_format == "WEBP":
+                variant_name = f"{VARIANTS_DIR}/{stem}_{name}.webp"
+                if img.mode not in ("RGB", "RGBA"):
+                    img = img.convert("RGBA")
+                img.save(os.path.join(media_root, variant_name), "WEBP", quality=80, method=4)
+            else:
+                variant_name = f"{VARIANTS_DIR}/{stem}_{name}{ext.lower()}"
+                img.save(os.path.join(media_root, variant_name), source.format)
+
+            result[name] = variant_name
+    return result
+
+
+class ImageProcessingPool:
+    def __init__(self):
+        self.executor = None
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(getattr(settings, "POSTS_IMAGE_MAX_PENDING", 32))
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=getattr(settings, "POSTS_IMAGE_WORKERS", None),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self.executor
+
+    def submit(self, post_id, image_name):
+        if not self.slots.acquire(blocking=False):
+            # не задерживаем поток запроса: пост остается pending до process_pending_images
+            logger.warning(f"Очередь обработки изображений заполнена, пост {post_id} оставлен в ожидании")
+            metrics.counter("image_processing_deferred_total").inc()
+            return
+
+        try:
+            future = self._get_executor().submit(generate_image_variants, str(settings.MEDIA_ROOT), image_name)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda f: self._on_done(f, post_id, image_name))
+
+    def _on_done(self, future, post_id, image_name):
+        self.slots.release()
+        try:
+            variants = future.result()
+        except Exception as e:
+            logger.error(f"Ошибка обработки изображения поста {post_id}: {e}")
+            variants = None
+
+        try:
+            store_image_variants(image_name, variants)
+        finally:
+            close_old_connections()
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=wait)
+                self.executor = None
+
+
+def store_image_variants(image_name, variants):
+    from posts.models import MediaBlob, Post
+
+    status = IMAGE_STATUS_FAILED if variants is None else IMAGE_STATUS_READY
+    if variants:
+        MediaBlob.objects.filter(name=image_name).update(image_variants=variants)
+
+    posts = Post.objects.filter(image=image_name).exclude(image_status=IMAGE_STATUS_READY)
+    root_ids = list(posts.values_list("thread_root_id", flat=True))
+    if posts.update(image_status=status, image_variants=variants or {}):
+        Post._bump_thread_version(*root_ids)
+
+
+def process_image(image_name):
+    try:
+        variants = generate_image_variants(str(settings.MEDIA_ROOT), image_name)
+    except Exception as e:
+        logger.error(f"Ошибка обработки изображения {image_name}: {e}")
+        variants = None
+    store_image_variants(image_name, variants)
+
+
+def pending_images(older_than, limit=None):
+    from posts.models import Post
+
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    images = (
+        Post.objects.filter(image_status=IMAGE_STATUS_PENDING, timestamp__lte=cutoff)
+        .order_by("image")
+        .values_list("image", flat=True)
+        .distinct()
+    )
+    return list(images[:limit] if limit else images)
+
+
+def sweep_pending_images(older_than, limit=None):
+    # подбирает изображения, которые пул не взял или потерял при перезапуске процесса
+    images = pending_images(older_than, limit)
+    for image_name in images:
+        process_image(image_name)
+    return len(images)
+
+
+image_processing_pool = ImageProcessingPool()
+
+
+def schedule_image_processing(post_id, image_name):
+    try:
+        image_processing_pool.submit(post_id, image_name)
+    except Exception as e:
+        logger.error(f"Не удалось поставить изображение поста {post_id} в очередь обработки: {e}")
+        store_image_variants(image_name, None)
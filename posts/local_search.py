@@ -0,0 +1,281 @@
+import logging
+import re
+from datetime import datetime, time as datetime_time, timezone as datetime_timezone
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncDate
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.html import strip_tags
+
+from posts.pagination import decode_search_cursor, encode_search_cursor
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "posts_post_fts"
+POSTS_TABLE = "posts_post"
+# Веса колонок text, username, email в bm25 - как у multi_match в Elasticsearch
+BM25_WEIGHTS = (3.0, 2.0, 1.0)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def local_search_enabled():
+    return not getattr(settings, "ELASTICSEARCH_AVAILABLE", False) and connection.vendor == "sqlite"
+
+
+def create_fts_table(cursor):
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(text, username, email, tokenize='unicode61 remove_diacritics 2')"
+    )
+
+
+def match_expression(query):
+    tokens = TOKEN_RE.findall(query or "")
+    return " OR ".join(f'"{token}"*' for token in tokens)
+
+
+def parse_filter_datetime(value, end_of_day=False):
+    if isinstance(value, datetime):
+        return value
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        day = parse_date(str(value))
+        if day is None:
+            raise ValueError(f"Некорректная дата в фильтре: {value}")
+        parsed = datetime.combine(day, datetime_time.max if end_of_day else datetime_time.min)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime_timezone.utc)
+    return parsed
+
+
+def filter_clauses(filters):
+    clauses, params = [], []
+    if not filters:
+        return clauses, params
+    if filters.get("username"):
+        clauses.append("p.username = %s")
+        params.append(filters["username"])
+    if filters.get("date_from"):
+        clauses.append("p.timestamp >= %s")
+        params.append(connection.ops.adapt_datetimefield_value(parse_filter_datetime(filters["date_from"])))
+    if filters.get("date_to"):
+        clauses.append("p.timestamp <= %s")
+        params.append(
+            connection.ops.adapt_datetimefield_value(parse_filter_datetime(filters["date_to"], end_of_day=True))
+        )
+    if filters.get("parent_post_id"):
+        clauses.append("p.parent_post_id = %s")
+        params.append(int(filters["parent_post_id"]))
+    return clauses, params
+
+
+class LocalSearchIndex:
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, username, email) VALUES (%s, %s, %s, %s)",
+                [post.pk, strip_tags(post.text), post.username, post.email],
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+    def rebuild(self, batch_size=1000):
+        from posts.models import Post
+
+        indexed = 0
+        with connection.cursor() as cursor:
+            create_fts_table(cursor)
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            rows = Post.objects.order_by("id").values_list("id", "text", "username", "email")
+            batch = []
+            for post_id, text, username, email in rows.iterator(chunk_size=batch_size):
+                batch.append((post_id, strip_tags(text), username, email))
+                if len(batch) >= batch_size:
+                    cursor.executemany(
+                        f"INSERT INTO {FTS_TABLE} (rowid, text, username, email) VALUES (%s, %s, %s, %s)", batch
+                    )
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, text, username, email) VALUES (%s, %s, %s, %s)", batch
+                )
+                indexed += len(batch)
+        return indexed
+
+    def filter_queryset(self, queryset, query):
+        expression = match_expression(query)
+        if not expression:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression])
+        )
+
+    def _base(self, query, filters):
+        clauses, params = filter_clauses(filters)
+        expression = match_expression(query)
+        if expression:
+            source = f"{FTS_TABLE} f JOIN {POSTS_TABLE} p ON p.id = f.rowid"
+            clauses.insert(0, f"{FTS_TABLE} MATCH %s")
+            params.insert(0, expression)
+        else:
+            source = f"{POSTS_TABLE} p"
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return source, where, params, bool(expression)
+
+    def search(self, query, size=20, from_=0, filters=None, after=None, aggregations=None):
+        source, where, params, ranked = self._base(query, filters)
+        if ranked:
+            score = f"-bm25({FTS_TABLE}, {', '.join(str(weight) for weight in BM25_WEIGHTS)})"
+            sort_column = score
+            order = "score DESC, p.id DESC"
+        else:
+            score = "NULL"
+            sort_column = "p.timestamp"
+            order = "p.timestamp DESC, p.id DESC"
+
+        page_where, page_params = where, list(params)
+        if after:
+            (sort_value, last_id), _ = decode_search_cursor(after)
+            if not ranked:
+                sort_value = connection.ops.adapt_datetimefield_value(datetime.fromisoformat(sort_value))
+            seek = f"({sort_column} < %s OR ({sort_column} = %s AND p.id < %s))"
+            page_where = f"{where} AND {seek}" if where else f"WHERE {seek}"
+            page_params += [sort_value, sort_value, last_id]
+            from_ = 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT p.id, p.username, p.email, p.text, p.timestamp, p.parent_post_id, {score} AS score "
+                f"FROM {source} {page_where} ORDER BY {order} LIMIT %s OFFSET %s",
+                page_params + [size + 1, from_],
+            )
+            columns = [column[0] for column in cursor.description]
+            hits = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+            cursor.execute(f"SELECT COUNT(*) FROM {source} {where}", params)
+            total = cursor.fetchone()[0]
+
+        next_cursor = None
+        if len(hits) > size:
+            hits = hits[:size]
+            last = hits[-1]
+            next_cursor = encode_search_cursor(
+                [last["score"] if ranked else last["timestamp"].isoformat(), last["id"]]
+            )
+
+        return {
+            "hits": hits,
+            "total": total,
+            "aggregations": self.facets(source, where, params, aggregations) if aggregations else None,
+            "next_cursor": next_cursor,
+        }
+
+    def facets(self, source, where, params, aggregations):
+        result = {}
+        with connection.cursor() as cursor:
+            if "usernames" in aggregations:
+                cursor.execute(
+                    f"SELECT p.username, COUNT(*) AS doc_count FROM {source} {where} "
+                    f"GROUP BY p.username ORDER BY doc_count DESC, p.username LIMIT 10",
+                    params,
+                )
+                result["usernames"] = {
+                    "buckets": [{"key": key, "doc_count": count} for key, count in cursor.fetchall()]
+                }
+
+            if "dates" in aggregations:
+                cursor.execute(
+                    f"SELECT date(p.timestamp) AS day, COUNT(*) FROM {source} {where} GROUP BY day ORDER BY day",
+                    params,
+                )
+                result["dates"] = {
+                    "buckets": [{"key_as_string": day, "doc_count": count} for day, count in cursor.fetchall()]
+                }
+        return result
+
+
+local_search_index = LocalSearchIndex()
+
+# Без полнотекстового индекса каждый терм - отдельный LIKE по трем колонкам
+DATABASE_SEARCH_MAX_TERMS = 5
+
+
+def cursor_timestamp(sort_value):
+    if isinstance(sort_value, str):
+        return datetime.fromisoformat(sort_value)
+    if isinstance(sort_value, int):
+        # Elasticsearch отдает значения сортировки по дате в миллисекундах
+        return datetime.fromtimestamp(sort_value / 1000, tz=datetime_timezone.utc)
+    raise ValueError("Курсор релевантного поиска нельзя продолжить по базе данных")
+
+
+def database_search(query, size=20, from_=0, filters=None, after=None, aggregations=None):
+    """Поиск прямо по таблице постов - резерв, когда поисковый индекс недоступен."""
+    from posts.models import Post
+
+    queryset = Post.objects.all()
+    terms = TOKEN_RE.findall(query or "")[:DATABASE_SEARCH_MAX_TERMS]
+    if terms:
+        condition = Q()
+        for term in terms:
+            condition |= Q(text__icontains=term) | Q(username__icontains=term) | Q(email__icontains=term)
+        queryset = queryset.filter(condition)
+
+    filters = filters or {}
+    if filters.get("username"):
+        queryset = queryset.filter(username=filters["username"])
+    if filters.get("date_from"):
+        queryset = queryset.filter(timestamp__gte=parse_filter_datetime(filters["date_from"]))
+    if filters.get("date_to"):
+        queryset = queryset.filter(timestamp__lte=parse_filter_datetime(filters["date_to"], end_of_day=True))
+    if filters.get("parent_post_id"):
+        queryset = queryset.filter(parent_post_id=int(filters["parent_post_id"]))
+
+    page = queryset.order_by("-timestamp", "-id")
+    if after:
+        (sort_value, last_id), _ = decode_search_cursor(after)
+        timestamp = cursor_timestamp(sort_value)
+        page = page.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=last_id))
+        from_ = 0
+
+    fields = ("id", "username", "email", "text", "timestamp", "parent_post_id")
+    hits = [dict(row, score=None) for row in page.values(*fields)[from_:from_ + size + 1]]
+
+    next_cursor = None
+    if len(hits) > size:
+        hits = hits[:size]
+        next_cursor = encode_search_cursor([hits[-1]["timestamp"].isoformat(), hits[-1]["id"]])
+
+    result_aggregations = None
+    if aggregations:
+        result_aggregations = {}
+        if "usernames" in aggregations:
+            buckets = (
+                queryset.values("username").annotate(doc_count=Count("id")).order_by("-doc_count", "username")[:10]
+            )
+            result_aggregations["usernames"] = {
+                "buckets": [{"key": row["username"], "doc_count": row["doc_count"]} for row in buckets]
+            }
+        if "dates" in aggregations:
+            buckets = queryset.annotate(day=TruncDate("timestamp")).values("day").annotate(doc_count=Count("id"))
+            result_aggregations["dates"] = {
+                "buckets": [
+                    {"key_as_string": row["day"].isoformat(), "doc_count": row["doc_count"]}
+                    for row in buckets.order_by("day")
+                ]
+            }
+
+    return {
+        "hits": hits,
+        "total": queryset.count(),
+        "aggregations": result_aggregations,
+        "next_cursor": next_cursor,
+    }
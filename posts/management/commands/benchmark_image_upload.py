@@ -0,0 +1,74 @@
+import io
+import os
+import tempfile
+import time
+
+from PIL import Image
+from django.core.management.base import BaseCommand
+
+from posts.image_processing import ORIGINAL_MAX_SIZE, downscale_upload
+
+
+class Command(BaseCommand):
+    help = "Сравнение загрузки изображений: запись оригинала с пересохранением и уменьшение в памяти"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--width", type=int, default=4000, help="Ширина тестового изображения")
+        parser.add_argument("--height", type=int, default=3000, help="Высота тестового изображения")
+        parser.add_argument("--format", default="JPEG", choices=["JPEG", "PNG"], help="Формат изображения")
+        parser.add_argument("--iterations", type=int, default=10, help="Количество загрузок")
+
+    def make_upload(self, width, height, image_format):
+        img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, image_format)
+        return buffer.getvalue()
+
+    def write_then_resize(self, payload, path):
+        with open(path, "wb") as f:
+            f.write(payload)
+        written = len(payload)
+
+        img = Image.open(path)
+        if img.width > ORIGINAL_MAX_SIZE[0] or img.height > ORIGINAL_MAX_SIZE[1]:
+            img.thumbnail(ORIGINAL_MAX_SIZE, Image.Resampling.LANCZOS)
+            img.save(path)
+            written += os.path.getsize(path)
+        return written
+
+    def resize_then_write(self, payload, path):
+        upload = io.BytesIO(payload)
+        upload.name = os.path.basename(path)
+        downscaled = downscale_upload(upload) or upload
+        downscaled.seek(0)
+        data = downscaled.read()
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    def handle(self, *args, **options):
+        image_format = options["format"]
+        iterations = options["iterations"]
+        payload = self.make_upload(options["width"], options["height"], image_format)
+        ext = ".jpg" if image_format == "JPEG" else ".png"
+
+        self.stdout.write(
+            f"Изображение {options['width']}x{options['height']} {image_format}, "
+            f"{len(payload) / 1024:.1f} КБ, загрузок: {iterations}"
+        )
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for label, method in (
+                ("до (запись, чтение, перезапись)", self.write_then_resize),
+                ("после (уменьшение в памяти)", self.resize_then_write),
+            ):
+                written = 0
+                started = time.perf_counter()
+                for i in range(iterations):
+                    written += method(payload, os.path.join(tmp_dir, f"upload_{i}{ext}"))
+                elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"{label}: {elapsed / iterations * 1000:.1f} мс на загрузку, "
+                    f"{written / iterations / 1024:.1f} КБ записано на загрузку"
+                )
@@ -0,0 +1,142 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ELASTICSEARCH_AVAILABLE = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
+
+# Маппинг индекса posts до перехода на keyword-подполя: terms-агрегация по
+# анализируемому полю работает только с fielddata в heap
+LEGACY_INDEX = {
+    "settings": {"number_of_shards": 1, "number_of_replicas": 0},
+    "mappings": {
+        "properties": {
+            "id": {"type": "long"},
+            "username": {"type": "text", "fielddata": True},
+            "email": {"type": "text"},
+            "text": {"type": "text"},
+            "timestamp": {"type": "date"},
+            "parent_post_id": {"type": "integer"},
+        }
+    },
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+if ELASTICSEARCH_AVAILABLE:
+    class Command(BaseCommand):
+        help = "Сравнение задержки фильтрованного поиска и агрегаций: старый и keyword-маппинг индекса постов"
+
+        def add_arguments(self, parser):
+            parser.add_argument("--documents", type=int, default=100000, help="Количество тестовых документов")
+            parser.add_argument("--users", type=int, default=1000, help="Количество разных авторов")
+            parser.add_argument("--iterations", type=int, default=200, help="Повторов каждого запроса")
+            parser.add_argument("--keep", action="store_true", help="Не удалять тестовые индексы")
+
+        def generate_documents(self, count, users):
+            words = ["django", "kafka", "search", "index", "python", "graphql", "cluster", "mapping"]
+            start = datetime.now(timezone.utc) - timedelta(days=365)
+            for i in range(count):
+                yield {
+                    "id": i + 1,
+                    "username": f"user{random.randrange(users)}",
+                    "email": f"user{i % users}@example.com",
+                    "text": " ".join(random.choices(words, k=30)),
+                    "timestamp": (start + timedelta(seconds=random.randrange(365 * 24 * 3600))).isoformat(),
+                    "parent_post_id": random.randrange(count) if i % 3 else None,
+                }
+
+        def queries(self, username_field):
+            since = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+            return {
+                "фильтр по автору и дате": {
+                    "query": {"bool": {"filter": [
+                        {"term": {username_field: "user7"}},
+                        {"range": {"timestamp": {"gte": since}}},
+                    ]}},
+                    "sort": [{"timestamp": "desc"}, {"id": "desc"}],
+                    "size": 20,
+                },
+                "агрегации usernames/dates": {
+                    "size": 0,
+                    "aggs": {
+                        "usernames": {"terms": {"field": username_field, "size": 10}},
+                        "dates": {"date_histogram": {"field": "timestamp", "calendar_interval": "day"}},
+                    },
+                },
+                "последние посты": {
+                    "query": {"match_all": {}},
+                    "sort": [{"timestamp": "desc"}, {"id": "desc"}],
+                    "size": 20,
+                    "track_total_hits": False,
+                },
+            }
+
+        def measure(self, client, index, body, iterations):
+            client.search(index=index, **body)
+            latencies, took = [], []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                response = client.search(index=index, **body)
+                latencies.append((time.perf_counter() - started) * 1000)
+                took.append(response["took"])
+            return latencies, took
+
+        def handle(self, *args, **options):
+            from elasticsearch.helpers import bulk
+            from posts.documents import PostDocument
+
+            client = PostDocument._get_connection()
+            alias = PostDocument._index._name
+            keyword_index = PostDocument._index.to_dict()
+            variants = (
+                ("старый маппинг", f"{alias}-bench-legacy", LEGACY_INDEX, "username"),
+                ("keyword-маппинг", f"{alias}-bench-keyword", keyword_index, "username.raw"),
+            )
+
+            random.seed(42)
+            documents = list(self.generate_documents(options["documents"], options["users"]))
+
+            try:
+                for label, index, body, _ in variants:
+                    if client.indices.exists(index=index):
+                        client.indices.delete(index=index)
+                    settings_body = dict(body.get("settings", {}), refresh_interval="-1")
+                    client.indices.create(index=index, settings=settings_body, mappings=body["mappings"])
+
+                    started = time.perf_counter()
+                    bulk(client, ({"_index": index, "_id": doc["id"], "_source": doc} for doc in documents),
+                         chunk_size=2000)
+                    client.indices.refresh(index=index)
+                    client.indices.forcemerge(index=index, max_num_segments=1)
+                    self.stdout.write(
+                        f"{label}: загружено {len(documents)} документов за {time.perf_counter() - started:.1f} с"
+                    )
+
+                for label, index, _, username_field in variants:
+                    self.stdout.write(f"{label} ({index}):")
+                    for name, body in self.queries(username_field).items():
+                        latencies, took = self.measure(client, index, body, options["iterations"])
+                        self.stdout.write(
+                            f"  {name}: p50 {percentile(latencies, 0.5):.1f} мс, "
+                            f"p95 {percentile(latencies, 0.95):.1f} мс, took p50 {percentile(took, 0.5)} мс"
+                        )
+                    stats = client.indices.stats(index=index, metric="fielddata")
+                    fielddata = stats["indices"][index]["total"]["fielddata"]["memory_size_in_bytes"]
+                    self.stdout.write(f"  fielddata в heap: {fielddata / 1024:.1f} КБ")
+            finally:
+                if not options["keep"]:
+                    for _, index, _, _ in variants:
+                        client.indices.delete(index=index, ignore_unavailable=True)
+else:
+    class Command(BaseCommand):
+        help = "Сравнение маппингов индекса постов (требуется Elasticsearch)"
+
+        def handle(self, *args, **options):
+            self.stdout.write(self.style.WARNING("Elasticsearch недоступен. Запустите сервис для использования этой команды."))
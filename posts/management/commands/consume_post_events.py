@@ -0,0 +1,108 @@
+import logging
+import multiprocessing
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(options):
+    import django
+
+    django.setup()
+
+    from kafka import KafkaConsumer
+    from common.kafka_codec import event_codec
+    from posts.event_worker import PostEventWorker
+
+    kafka_config = getattr(settings, "KAFKA_CONFIG", {})
+    consumer = KafkaConsumer(
+        options["topic"],
+        bootstrap_servers=kafka_config.get("bootstrap_servers", ["localhost:9092"]),
+        client_id=f"{kafka_config.get('client_id', 'django-posts')}-consumer",
+        group_id=options["group_id"],
+        enable_auto_commit=False,
+        auto_offset_reset="earliest",
+        value_deserializer=event_codec.decode,
+        key_deserializer=lambda k: k.decode("utf-8") if k else None,
+    )
+    worker = PostEventWorker(
+        consumer,
+        batch_size=options["batch_size"],
+        index=not options["no_index"],
+        process_media=not options["no_media"],
+    )
+    try:
+        worker.run(threading.Event())
+    finally:
+        consumer.close()
+
+
+class Command(BaseCommand):
+    help = "Обработка событий post_created из Kafka: индексация и обработка изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Количество процессов-потребителей в группе"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Максимум сообщений в одном пакете"
+        )
+        parser.add_argument(
+            "--group-id",
+            default=getattr(settings, "KAFKA_CONSUMER_GROUP", "posts-workers"),
+            help="Группа потребителей Kafka"
+        )
+        parser.add_argument(
+            "--topic",
+            default=getattr(settings, "KAFKA_POSTS_TOPIC", "posts"),
+            help="Топик с событиями постов"
+        )
+        parser.add_argument(
+            "--no-index",
+            action="store_true",
+            help="Не индексировать посты в Elasticsearch"
+        )
+        parser.add_argument(
+            "--no-media",
+            action="store_true",
+            help="Не обрабатывать изображения"
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "KAFKA_AVAILABLE", False):
+            self.stdout.write(self.style.WARNING("Kafka недоступна. Запустите сервис для использования этой команды."))
+            return
+
+        worker_options = {
+            key: options[key] for key in ("topic", "group_id", "batch_size", "no_index", "no_media")
+        }
+        self.stdout.write(
+            f"Запускаю {options['processes']} потребителей группы {options['group_id']} для топика {options['topic']}"
+        )
+
+        if options["processes"] <= 1:
+            run_worker(worker_options)
+            return
+
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=run_worker, args=(worker_options,), name=f"post-events-{i}")
+            for i in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
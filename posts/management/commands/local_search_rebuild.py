@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.local_search import local_search_enabled, local_search_index
+
+
+class Command(BaseCommand):
+    help = "Перестроение встроенного полнотекстового индекса постов (SQLite FTS5)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество постов в одной вставке"
+        )
+
+    def handle(self, *args, **options):
+        if not local_search_enabled():
+            self.stdout.write(self.style.WARNING(
+                "Встроенный поиск используется только с SQLite при отключенном Elasticsearch"
+            ))
+            return
+
+        started = time.perf_counter()
+        indexed = local_search_index.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Проиндексировано постов: {indexed} за {time.perf_counter() - started:.1f} с"
+        ))
@@ -0,0 +1,55 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Обработка изображений, оставшихся в статусе pending"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=float,
+            default=getattr(settings, "POSTS_IMAGE_PENDING_GRACE", 300),
+            help="Обрабатывать посты, ожидающие дольше указанного времени, сек"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Количество изображений в одном пакете"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60.0,
+            help="Пауза между проходами, сек"
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать ожидающие изображения один раз и завершиться"
+        )
+
+    def handle(self, *args, **options):
+        from posts.image_processing import sweep_pending_images
+
+        batch_size = options["batch_size"]
+
+        while True:
+            processed = sweep_pending_images(options["older_than"], batch_size)
+            if processed:
+                self.stdout.write(f"Обработано изображений: {processed}")
+                logger.info(f"pending_images processed={processed}")
+
+            if options["once"]:
+                if processed < batch_size:
+                    break
+                continue
+
+            if processed < batch_size:
+                time.sleep(options["interval"])
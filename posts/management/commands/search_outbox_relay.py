@@ -0,0 +1,61 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ELASTICSEARCH_AVAILABLE = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
+
+logger = logging.getLogger(__name__)
+
+
+if ELASTICSEARCH_AVAILABLE:
+    class Command(BaseCommand):
+        help = "Отправка изменений постов из outbox в Elasticsearch"
+
+        def add_arguments(self, parser):
+            parser.add_argument(
+                "--batch-size",
+                type=int,
+                default=getattr(settings, "SEARCH_OUTBOX_BATCH_SIZE", 500),
+                help="Количество записей outbox в одном пакете"
+            )
+            parser.add_argument(
+                "--interval",
+                type=float,
+                default=getattr(settings, "SEARCH_OUTBOX_POLL_INTERVAL", 1.0),
+                help="Пауза между опросами пустого outbox, сек"
+            )
+            parser.add_argument(
+                "--once",
+                action="store_true",
+                help="Обработать outbox один раз и завершиться"
+            )
+
+        def handle(self, *args, **options):
+            from posts.search_outbox import outbox_lag, relay_batch
+
+            batch_size = options["batch_size"]
+
+            while True:
+                processed = relay_batch(batch_size)
+                lag = outbox_lag()
+                if processed:
+                    self.stdout.write(f"Отправлено записей: {processed}, задержка outbox: {lag:.1f} с")
+                    logger.info(f"search_outbox processed={processed} lag_seconds={lag:.1f}")
+
+                if options["once"]:
+                    if processed < batch_size:
+                        break
+                    continue
+
+                if processed < batch_size:
+                    time.sleep(options["interval"])
+else:
+    class Command(BaseCommand):
+        help = "Elasticsearch недоступен"
+
+        def handle(self, *args, **options):
+            self.stdout.write(
+                self.style.WARNING("Elasticsearch недоступен. Запустите сервис для использования этой команды.")
+            )
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_thread_index(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+
+    positions = {}
+    pending = list(Post.objects.order_by("id").values_list("id", "parent_post_id"))
+    while pending:
+        remaining = []
+        for post_id, parent_id in pending:
+            if parent_id is None:
+                positions[post_id] = (post_id, f"{post_id:010d}/", 0)
+            elif parent_id in positions:
+                root_id, parent_path, parent_depth = positions[parent_id]
+                positions[post_id] = (root_id, f"{parent_path}{post_id:010d}/", parent_depth + 1)
+            else:
+                remaining.append((post_id, parent_id))
+        if len(remaining) == len(pending):
+            break
+        pending = remaining
+
+    posts = []
+    for post in Post.objects.filter(id__in=positions.keys()).only("id"):
+        post.thread_root_id, post.thread_path, post.depth = positions[post.id]
+        posts.append(post)
+    Post.objects.bulk_update(posts, ["thread_root", "thread_path", "depth"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_alter_post_options_alter_post_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thread_path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1024),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thread_root',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='thread_posts', to='posts.post'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=models.TextField(help_text='Текст поста (обязательное поле)'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['thread_root', 'thread_path'], name='posts_post_thread_idx'),
+        ),
+        migrations.RunPython(backfill_thread_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:07
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_reply_stats(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+
+    stats = (
+        Post.objects.filter(parent_post__isnull=False)
+        .values("parent_post_id")
+        .annotate(reply_count=Count("id"), last_reply_at=Max("timestamp"))
+    )
+    for row in stats:
+        Post.objects.filter(pk=row["parent_post_id"]).update(
+            reply_count=row["reply_count"],
+            last_reply_at=row["last_reply_at"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='last_reply_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_reply_stats, migrations.RunPython.noop),
+    ]
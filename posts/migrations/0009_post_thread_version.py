@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_reply_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thread_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
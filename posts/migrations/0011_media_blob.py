@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:11
+
+import common.validators
+import posts.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_media_blobs(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    MediaBlob = apps.get_model("posts", "MediaBlob")
+
+    refcounts = {}
+    for field_name in ("image", "text_file"):
+        rows = Post.objects.exclude(**{field_name: ""}).exclude(**{f"{field_name}__isnull": True})
+        for row in rows.values(field_name).annotate(refcount=Count("id")):
+            refcounts[row[field_name]] = refcounts.get(row[field_name], 0) + row["refcount"]
+
+    variants = dict(Post.objects.exclude(image_variants={}).values_list("image", "image_variants"))
+    MediaBlob.objects.bulk_create(
+        [
+            MediaBlob(name=name, refcount=refcount, image_variants=variants.get(name, {}))
+            for name, refcount in refcounts.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('image_variants', models.JSONField(blank=True, default=dict)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(allow_overwrite=True), upload_to='', validators=[common.validators.validate_image_extension]),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text_file',
+            field=models.FileField(blank=True, null=True, storage=posts.storage.ContentAddressedStorage(allow_overwrite=True), upload_to='text_files/', validators=[common.validators.validate_text_file_size]),
+        ),
+        migrations.RunPython(backfill_media_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_search_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchoutboxentry',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
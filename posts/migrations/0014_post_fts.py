@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:02
+
+from django.db import migrations
+from django.utils.html import strip_tags
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    Post = apps.get_model("posts", "Post")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts "
+            "USING fts5(text, username, email, tokenize='unicode61 remove_diacritics 2')"
+        )
+        rows = Post.objects.order_by("id").values_list("id", "text", "username", "email")
+        cursor.executemany(
+            "INSERT INTO posts_post_fts (rowid, text, username, email) VALUES (%s, %s, %s, %s)",
+            [(post_id, strip_tags(text), username, email) for post_id, text, username, email in rows.iterator()],
+        )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS posts_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_search_outbox_processed_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-18 03:27
+
+from datetime import timezone
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    PostDayRollup = apps.get_model("posts", "PostDayRollup")
+    PostUserRollup = apps.get_model("posts", "PostUserRollup")
+    PostRollupTotals = apps.get_model("posts", "PostRollupTotals")
+
+    days = (
+        Post.objects.annotate(day=TruncDate("timestamp", tzinfo=timezone.utc))
+        .values("day")
+        .annotate(post_count=Count("id"))
+    )
+    PostDayRollup.objects.bulk_create(
+        [PostDayRollup(day=row["day"], post_count=row["post_count"]) for row in days],
+        batch_size=500,
+    )
+
+    users = Post.objects.values("username").annotate(post_count=Count("id"))
+    PostUserRollup.objects.bulk_create(
+        [PostUserRollup(username=row["username"], post_count=row["post_count"]) for row in users],
+        batch_size=500,
+    )
+
+    PostRollupTotals.objects.create(
+        pk=1,
+        total_posts=Post.objects.count(),
+        unique_users=PostUserRollup.objects.count(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostRollupTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_posts', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostUserRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=64, unique=True)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='thread_path',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
@@ -1,11 +1,164 @@
-from PIL import Image
-from django.db import models
+from datetime import timezone as dt_timezone
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models import F, Subquery
+from django.db.models.functions import Greatest
+from django.utils import timezone
 import logging
 
 from common.validators import validate_image_extension, validate_text_file_size
+from posts.local_search import local_search_enabled, local_search_index
+from posts.storage import content_addressed_storage
 
 logger = logging.getLogger(__name__)
 
+THREAD_PATH_STEP = 10
+
+
+def build_thread_path(parent_path, post_id):
+    return f"{parent_path}{post_id:0{THREAD_PATH_STEP}d}/"
+
+
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    image_variants = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def acquire(cls, name):
+        blob, created = cls.objects.get_or_create(name=name, defaults={"refcount": 1})
+        if not created:
+            cls.objects.filter(pk=blob.pk).update(refcount=F("refcount") + 1)
+        return blob
+
+    @classmethod
+    def release(cls, name):
+        cls.objects.filter(name=name, refcount__gt=0).update(refcount=F("refcount") - 1)
+        transaction.on_commit(partial(cls.collect, name))
+
+    @classmethod
+    def collect(cls, name):
+        blob = cls.objects.filter(name=name, refcount=0).first()
+        if blob is None or not cls.objects.filter(pk=blob.pk, refcount=0).delete()[0]:
+            return
+
+        for file_name in [name, *blob.image_variants.values()]:
+            try:
+                content_addressed_storage.delete(file_name)
+            except Exception as e:
+                logger.error(f"Ошибка удаления файла {file_name}: {e}")
+
+
+class SearchOutboxEntry(models.Model):
+    ACTION_INDEX = "index"
+    ACTION_DELETE = "delete"
+
+    post_id = models.BigIntegerField(db_index=True)
+    action = models.CharField(max_length=16)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.action} {self.post_id}"
+
+    @classmethod
+    def enqueue(cls, post_id, action):
+        if getattr(settings, "ELASTICSEARCH_AVAILABLE", False):
+            cls.objects.create(post_id=post_id, action=action)
+
+
+class SearchGeneration(models.Model):
+    # Поколение кеша результатов поиска: меняют relay, потребители и переиндексация
+    # в других процессах, поэтому оно хранится в базе, а не в локальном кеше
+    generation = models.BigIntegerField(default=0)
+
+    SINGLETON_ID = 1
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=cls.SINGLETON_ID).values_list("generation", flat=True).first() or 0
+
+    @classmethod
+    async def acurrent(cls):
+        return await cls.objects.filter(pk=cls.SINGLETON_ID).values_list("generation", flat=True).afirst() or 0
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=cls.SINGLETON_ID).update(generation=F("generation") + 1):
+            cls.objects.get_or_create(pk=cls.SINGLETON_ID)
+            cls.objects.filter(pk=cls.SINGLETON_ID).update(generation=F("generation") + 1)
+        return cls.current()
+
+
+class PostDayRollup(models.Model):
+    day = models.DateField(unique=True)
+    post_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.post_count}"
+
+
+class PostUserRollup(models.Model):
+    username = models.CharField(max_length=64, unique=True)
+    post_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.username}: {self.post_count}"
+
+
+class PostRollupTotals(models.Model):
+    total_posts = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0)
+
+    SINGLETON_ID = 1
+
+    @classmethod
+    def record(cls, username, timestamp, delta):
+        cls.objects.get_or_create(pk=cls.SINGLETON_ID)
+        # Дни считаются в UTC, как date_histogram в Elasticsearch
+        day = timestamp.astimezone(dt_timezone.utc).date() if timezone.is_aware(timestamp) else timestamp.date()
+        PostDayRollup.objects.get_or_create(day=day)
+        user_rollup, _ = PostUserRollup.objects.get_or_create(username=username)
+
+        unique_delta = 0
+        if delta > 0:
+            PostDayRollup.objects.filter(day=day).update(post_count=F("post_count") + 1)
+            if PostUserRollup.objects.filter(pk=user_rollup.pk, post_count=0).update(post_count=1):
+                unique_delta = 1
+            else:
+                PostUserRollup.objects.filter(pk=user_rollup.pk).update(post_count=F("post_count") + 1)
+        else:
+            PostDayRollup.objects.filter(day=day, post_count__gt=0).update(post_count=F("post_count") - 1)
+            if PostUserRollup.objects.filter(pk=user_rollup.pk, post_count=1).update(post_count=0):
+                unique_delta = -1
+            else:
+                PostUserRollup.objects.filter(pk=user_rollup.pk, post_count__gt=0).update(
+                    post_count=F("post_count") - 1
+                )
+
+        cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            total_posts=Greatest(F("total_posts") + delta, 0),
+            unique_users=Greatest(F("unique_users") + unique_delta, 0),
+        )
+
+    @classmethod
+    def snapshot(cls):
+        totals = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        days = PostDayRollup.objects.filter(post_count__gt=0).order_by("day").values_list("day", "post_count")
+        return {
+            "total_posts": totals.total_posts if totals else 0,
+            "unique_users": totals.unique_users if totals else 0,
+            "posts_by_date": [{"key_as_string": day.isoformat(), "doc_count": count} for day, count in days],
+        }
+
 
 class Post(models.Model):
     parent_post = models.OneToOneField("Post", on_delete=models.CASCADE, blank=True, null=True, related_name="child")
@@ -13,43 +166,191 @@ class Post(models.Model):
     email = models.EmailField()
     text = models.TextField(help_text="Текст поста (обязательное поле)")
     timestamp = models.DateTimeField(auto_now_add=True)
-    image = models.ImageField(null=True, blank=True, validators=[validate_image_extension])
+    image = models.ImageField(
+        null=True,
+        blank=True,
+        validators=[validate_image_extension],
+        storage=content_addressed_storage,
+    )
     text_file = models.FileField(
         upload_to="text_files/",
         null=True,
         blank=True,
         validators=[validate_text_file_size],
+        storage=content_addressed_storage,
     )
+    thread_root = models.ForeignKey(
+        "Post",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="thread_posts",
+        editable=False,
+    )
+    # путь растет на THREAD_PATH_STEP + 1 символ с каждым уровнем, а глубина ветки не ограничена
+    thread_path = models.TextField(blank=True, default="", editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    last_reply_at = models.DateTimeField(null=True, blank=True, editable=False)
+    thread_version = models.PositiveIntegerField(default=0, editable=False)
+    image_status = models.CharField(max_length=16, blank=True, default="", editable=False)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["thread_root", "thread_path"], name="posts_post_thread_idx"),
+            models.Index(fields=["timestamp", "id"], name="posts_post_timestamp_idx"),
+            models.Index(fields=["username", "id"], name="posts_post_username_idx"),
+            models.Index(fields=["email", "id"], name="posts_post_email_idx"),
+        ]
+
+    # Колонки, которые ведутся через .update(); при сохранении существующей строки их не пишем,
+    # иначе устаревший экземпляр затрет счетчики ответов, версию ветки и статус изображения
+    MAINTAINED_FIELDS = frozenset({
+        "thread_root", "thread_root_id", "thread_path", "depth", "reply_count", "last_reply_at",
+        "thread_version", "image_status", "image_variants",
+    })
 
     def __str__(self):
         return f"{self.username}"
 
+    @property
+    def display_image_url(self):
+        if not self.image:
+            return ""
+        thumbnail = self.image_variants.get("thumbnail")
+        if thumbnail:
+            return default_storage.url(thumbnail)
+        return self.image.url
+
+    @property
+    def image_webp_srcset(self):
+        from .image_processing import IMAGE_VARIANTS
+
+        srcset = []
+        for name, (width, _, image_format) in IMAGE_VARIANTS.items():
+            if image_format == "WEBP" and name in self.image_variants:
+                srcset.append(f"{default_storage.url(self.image_variants[name])} {width}w")
+        return ", ".join(srcset)
+
+    def _update_thread_position(self, previous_path=None, previous_root_id=None):
+        if self.parent_post_id:
+            parent = self.parent_post
+            self.thread_root_id = parent.thread_root_id or parent.id
+            self.thread_path = build_thread_path(parent.thread_path, self.id)
+            self.depth = parent.depth + 1
+        else:
+            self.thread_root_id = self.id
+            self.thread_path = build_thread_path("", self.id)
+            self.depth = 0
+
+        Post.objects.filter(pk=self.pk).update(
+            thread_root_id=self.thread_root_id,
+            thread_path=self.thread_path,
+            depth=self.depth,
+        )
+
+        if previous_path and previous_path != self.thread_path:
+            # пути сравниваются только внутри прежней ветки: префикс не уникален между ветками
+            descendants = list(
+                Post.objects.filter(thread_root_id=previous_root_id, thread_path__startswith=previous_path)
+                .exclude(pk=self.pk)
+            )
+            for descendant in descendants:
+                descendant.thread_root_id = self.thread_root_id
+                descendant.thread_path = self.thread_path + descendant.thread_path[len(previous_path):]
+                descendant.depth = descendant.thread_path.count("/") - 1
+            Post.objects.bulk_update(descendants, ["thread_root", "thread_path", "depth"])
+
+    @staticmethod
+    def _update_reply_stats(post_id, delta):
+        latest_reply = Post.objects.filter(parent_post_id=post_id).order_by("-timestamp").values("timestamp")[:1]
+        Post.objects.filter(pk=post_id).update(
+            reply_count=Greatest(F("reply_count") + delta, 0),
+            last_reply_at=Subquery(latest_reply),
+        )
+
+    @staticmethod
+    def _bump_thread_version(*root_ids):
+        root_ids = {root_id for root_id in root_ids if root_id}
+        if root_ids:
+            Post.objects.filter(pk__in=root_ids).update(thread_version=F("thread_version") + 1)
+
+    def _assign_image_variants(self, blob):
+        from .image_processing import IMAGE_STATUS_PENDING, IMAGE_STATUS_READY, schedule_image_processing
+
+        if blob.image_variants:
+            self.image_status = IMAGE_STATUS_READY
+            self.image_variants = blob.image_variants
+        else:
+            self.image_status = IMAGE_STATUS_PENDING
+            self.image_variants = {}
+            if getattr(settings, "POSTS_IMAGE_PROCESSING", "pool") == "pool":
+                transaction.on_commit(partial(schedule_image_processing, self.pk, self.image.name))
+
+        Post.objects.filter(pk=self.pk).update(image_status=self.image_status, image_variants=self.image_variants)
+
     def save(self, *args, **kwargs):
         if not self.text or not self.text.strip():
             raise ValueError("Текст поста не может быть пустым")
-        
-        super().save(*args, **kwargs)
-
-        if self.image:
-            img = Image.open(self.image.path)
-
-            max_width, max_height = 320, 240
-
-            if img.width > max_width or img.height > max_height:
-                img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                img.save(self.image.path)
-        
-        try:
-            from .search_service import post_search_service
-            post_search_service.index_post(self)
-        except Exception as e:
-            logger.error(f"Ошибка индексации поста {self.id} в Elasticsearch: {e}")
-    
-    def delete(self, *args, **kwargs):
-        try:
-            from .search_service import post_search_service
-            post_search_service.remove_post(self.id)
-        except Exception as e:
-            logger.error(f"Ошибка удаления поста {self.id} из Elasticsearch: {e}")
-        
-        super().delete(*args, **kwargs)
\ No newline at end of file
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Post.objects.filter(pk=self.pk).values(
+                    "parent_post_id", "thread_path", "thread_root_id", "image", "text_file"
+                ).first()
+
+            if self.image and not self.image._committed:
+                from .image_processing import downscale_upload
+
+                try:
+                    downscaled = downscale_upload(self.image.file)
+                except Exception as e:
+                    logger.error(f"Ошибка уменьшения изображения {self.image.name}: {e}")
+                    self.image.file.seek(0)
+                    downscaled = None
+                if downscaled is not None:
+                    self.image = downscaled
+
+            if previous is not None and not kwargs.get("force_insert"):
+                update_fields = kwargs.get("update_fields")
+                if update_fields is None:
+                    update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+                kwargs["update_fields"] = [name for name in update_fields if name not in self.MAINTAINED_FIELDS]
+
+            super().save(*args, **kwargs)
+
+            previous_parent_id = previous["parent_post_id"] if previous else None
+            if previous is None or previous_parent_id != self.parent_post_id or not self.thread_path:
+                self._update_thread_position(
+                    previous["thread_path"] if previous else None,
+                    previous["thread_root_id"] if previous else None,
+                )
+
+            if previous_parent_id != self.parent_post_id:
+                if previous_parent_id:
+                    self._update_reply_stats(previous_parent_id, -1)
+                if self.parent_post_id:
+                    self._update_reply_stats(self.parent_post_id, 1)
+
+            for field_name in ("image", "text_file"):
+                previous_name = previous[field_name] if previous else ""
+                current_name = getattr(self, field_name).name or ""
+                if previous_name != current_name:
+                    if current_name:
+                        blob = MediaBlob.acquire(current_name)
+                        if field_name == "image":
+                            self._assign_image_variants(blob)
+                    if previous_name:
+                        MediaBlob.release(previous_name)
+
+            self._bump_thread_version(self.thread_root_id, previous["thread_root_id"] if previous else None)
+            if self.thread_root_id == self.pk:
+                # Версия растет только в базе; экземпляр должен ссылаться на новый ключ кеша ветки
+                self.refresh_from_db(fields=["thread_version"])
+            if previous is None:
+                PostRollupTotals.record(self.username, self.timestamp, 1)
+            SearchOutboxEntry.enqueue(self.pk, SearchOutboxEntry.ACTION_INDEX)
+            if local_search_enabled():
+                local_search_index.index_post(self)
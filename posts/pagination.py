@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(value, pk):
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, pk]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, field):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if field == "timestamp":
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, str):
+            # username и email - строки; null или число из подделанного курсора уронили бы фильтр
+            return None
+        return value, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def encode_search_cursor(sort_values, pit_id=None):
+    raw = json.dumps({"sort": list(sort_values), "pit": pit_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return list(data["sort"]), data.get("pit")
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Некорректный курсор поиска")
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, field, descending, per_page):
+        self.queryset = queryset
+        self.field = field
+        self.descending = descending
+        self.per_page = per_page
+
+    def _ordering(self, descending):
+        prefix = "-" if descending else ""
+        return f"{prefix}{self.field}", f"{prefix}id"
+
+    def _seek(self, queryset, cursor, descending):
+        value, pk = cursor
+        lookup = "lt" if descending else "gt"
+        return queryset.filter(
+            Q(**{f"{self.field}__{lookup}": value}) | Q(**{self.field: value, f"id__{lookup}": pk})
+        )
+
+    def _cursor_for(self, post):
+        return encode_cursor(getattr(post, self.field), post.id)
+
+    def get_page(self, after=None, before=None):
+        after = decode_cursor(after, self.field) if after else None
+        before = decode_cursor(before, self.field) if before else None
+
+        if before:
+            queryset = self._seek(self.queryset, before, not self.descending)
+            queryset = queryset.order_by(*self._ordering(not self.descending))
+            object_list = list(queryset[:self.per_page + 1])
+            has_more = len(object_list) > self.per_page
+            object_list = object_list[:self.per_page][::-1]
+            if not object_list:
+                return CursorPage([])
+            return CursorPage(
+                object_list,
+                next_cursor=self._cursor_for(object_list[-1]),
+                previous_cursor=self._cursor_for(object_list[0]) if has_more else None,
+            )
+
+        queryset = self.queryset
+        if after:
+            queryset = self._seek(queryset, after, self.descending)
+        queryset = queryset.order_by(*self._ordering(self.descending))
+        object_list = list(queryset[:self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if not object_list:
+            return CursorPage([])
+        return CursorPage(
+            object_list,
+            next_cursor=self._cursor_for(object_list[-1]) if has_more else None,
+            previous_cursor=self._cursor_for(object_list[0]) if after else None,
+        )
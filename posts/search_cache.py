@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from common.metrics import metrics
+from posts.models import SearchGeneration
+from posts.search_telemetry import normalize_query
+
+
+def search_generation():
+    return SearchGeneration.current()
+
+
+async def asearch_generation():
+    return await SearchGeneration.acurrent()
+
+
+def bump_search_generation():
+    return SearchGeneration.bump()
+
+
+def search_cache_key(query, filters, size, from_, *extra):
+    return (
+        normalize_query(query),
+        json.dumps(filters or {}, sort_keys=True, default=str),
+        size,
+        from_,
+    ) + extra
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SearchResultCache:
+    def __init__(self, max_entries=1000, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.flights = {}
+        self.lock = threading.Lock()
+
+    def _lookup(self, key, generation):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        entry_generation, expires_at, value = entry
+        if entry_generation != generation or expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def _store(self, key, generation, value):
+        self.entries[key] = (generation, time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key, generation):
+        with self.lock:
+            value = self._lookup(key, generation)
+        metrics.counter("search_cache_hits_total" if value is not None else "search_cache_misses_total").inc()
+        return value
+
+    def put(self, key, generation, value):
+        with self.lock:
+            self._store(key, generation, value)
+
+    def get_or_compute(self, key, compute, cacheable=lambda value: True):
+        generation = search_generation()
+        flight_key = (key, generation)
+
+        with self.lock:
+            value = self._lookup(key, generation)
+            if value is not None:
+                metrics.counter("search_cache_hits_total").inc()
+                return value
+            flight = self.flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[flight_key] = _Flight()
+
+        if not leader:
+            metrics.counter("search_cache_coalesced_total").inc()
+            flight.done.wait()
+            return flight.result if flight.result is not None else compute()
+
+        metrics.counter("search_cache_misses_total").inc()
+        try:
+            flight.result = compute()
+        finally:
+            with self.lock:
+                if flight.result is not None and cacheable(flight.result):
+                    self._store(key, generation, flight.result)
+                del self.flights[flight_key]
+            flight.done.set()
+        return flight.result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def build_search_result_cache():
+    config = getattr(settings, "SEARCH_RESULT_CACHE", {})
+    return SearchResultCache(
+        max_entries=config.get("max_entries", 1000),
+        ttl=config.get("ttl", 30),
+    )
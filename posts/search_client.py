@@ -0,0 +1,66 @@
+import threading
+
+from django.conf import settings
+
+DEFAULT_CLIENT_OPTIONS = {
+    "connections_per_node": 10,
+    "request_timeout": 10.0,
+    "max_retries": 2,
+    "retry_on_timeout": True,
+}
+
+
+def normalize_host(host):
+    # клиент 8.x требует схему, а в ELASTICSEARCH_DSL хосты заданы без нее
+    if isinstance(host, dict):
+        return dict({"scheme": "http"}, **host)
+    if "://" not in host:
+        return f"http://{host}"
+    return host
+
+
+def client_options():
+    options = dict(settings.ELASTICSEARCH_DSL.get("default", {}))
+    hosts = options.pop("hosts", ["localhost:9200"])
+    if isinstance(hosts, (str, dict)):
+        hosts = [hosts]
+    options = dict(DEFAULT_CLIENT_OPTIONS, **options)
+    options.update(getattr(settings, "ELASTICSEARCH_CLIENT", {}))
+    options["hosts"] = [normalize_host(host) for host in hosts]
+    return options
+
+
+def search_timeout():
+    return getattr(settings, "SEARCH_REQUEST_TIMEOUT", 2.0)
+
+
+def build_client():
+    from elasticsearch import Elasticsearch
+
+    return Elasticsearch(**client_options())
+
+
+def build_async_client():
+    # Транспорт AsyncElasticsearch работает на aiohttp
+    from elasticsearch import AsyncElasticsearch
+
+    return AsyncElasticsearch(**client_options())
+
+
+class LazyClient:
+    def __init__(self, factory):
+        self.factory = factory
+        self.client = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        if self.client is None:
+            with self.lock:
+                if self.client is None:
+                    self.client = self.factory()
+        return self.client
+
+    def reset(self):
+        with self.lock:
+            client, self.client = self.client, None
+        return client
@@ -0,0 +1,131 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from common.circuit_breaker import elasticsearch_breaker
+from common.metrics import elasticsearch_call, metrics
+from posts.models import SearchOutboxEntry
+from posts.search_cache import bump_search_generation
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 2
+RETRY_MAX_DELAY = 300
+
+
+def pending_entries():
+    return SearchOutboxEntry.objects.filter(processed_at__isnull=True)
+
+
+def outbox_lag():
+    oldest = pending_entries().aggregate(oldest=Min("created_at"))["oldest"]
+    if oldest is None:
+        return 0.0
+    return max((timezone.now() - oldest).total_seconds(), 0.0)
+
+
+def fetch_batch(batch_size):
+    now = timezone.now()
+    blocked = set(
+        pending_entries().filter(available_at__gt=now).values_list("post_id", flat=True)
+    )
+    entries = pending_entries().filter(available_at__lte=now).exclude(post_id__in=blocked)
+    return list(entries.order_by("id")[:batch_size])
+
+
+def coalesce(entries):
+    latest = {}
+    for entry in entries:
+        latest[entry.post_id] = entry
+    return latest
+
+
+def send_bulk(latest, index_name=None):
+    from elasticsearch.helpers import bulk
+    from posts.documents import PostDocument
+
+    document = PostDocument()
+    index_name = index_name or document._index._name
+    index_ids = [post_id for post_id, entry in latest.items() if entry.action == SearchOutboxEntry.ACTION_INDEX]
+    posts = {post.id: post for post in document.get_indexing_queryset().filter(id__in=index_ids)}
+
+    actions = []
+    for post_id in latest:
+        if post_id in posts:
+            action = document._prepare_action(posts[post_id], "index")
+            action["_index"] = index_name
+            actions.append(action)
+        else:
+            actions.append({"_op_type": "delete", "_index": index_name, "_id": post_id})
+
+    with elasticsearch_call("bulk"):
+        _, errors = bulk(document._get_connection(), actions, raise_on_error=False, stats_only=False)
+    metrics.counter("elasticsearch_bulk_actions_total").inc(len(actions))
+    metrics.counter("elasticsearch_bulk_errors_total").inc(len(errors))
+    bump_search_generation()
+
+    failed = set()
+    for error in errors:
+        op_type, details = next(iter(error.items()))
+        if op_type == "delete" and details.get("status") == 404:
+            continue
+        failed.add(int(details.get("_id")))
+        logger.error(f"Ошибка индексации поста {details.get('_id')} в Elasticsearch: {details.get('error')}")
+    return failed
+
+
+def schedule_retry(entries):
+    now = timezone.now()
+    for entry in entries:
+        delay = min(RETRY_BASE_DELAY ** (entry.attempts + 1), RETRY_MAX_DELAY)
+        SearchOutboxEntry.objects.filter(pk=entry.pk).update(
+            attempts=entry.attempts + 1,
+            available_at=now + timedelta(seconds=delay),
+        )
+
+
+def relay_batch(batch_size=None):
+    batch_size = batch_size or getattr(settings, "SEARCH_OUTBOX_BATCH_SIZE", 500)
+    entries = fetch_batch(batch_size)
+    if not entries:
+        return 0
+
+    # Пока цепь разомкнута, записи копятся в outbox без трат попыток и растущих задержек
+    if not elasticsearch_breaker.allow():
+        return 0
+
+    latest = coalesce(entries)
+    try:
+        with elasticsearch_breaker.measure():
+            failed = send_bulk(latest)
+    except Exception as e:
+        logger.error(f"Ошибка отправки пакета в Elasticsearch: {e}")
+        failed = set(latest)
+
+    now = timezone.now()
+    done = [entry.pk for entry in entries if entry.post_id not in failed]
+    SearchOutboxEntry.objects.filter(pk__in=done).update(processed_at=now)
+    schedule_retry([entry for entry in entries if entry.post_id in failed])
+
+    retention = getattr(settings, "SEARCH_OUTBOX_RETENTION", 24 * 60 * 60)
+    SearchOutboxEntry.objects.filter(processed_at__lt=now - timedelta(seconds=retention)).delete()
+
+    return len(done)
+
+
+def replay_since(since, index_name, batch_size=500):
+    entries = SearchOutboxEntry.objects.filter(created_at__gte=since).order_by("id")
+    last_id = 0
+    replayed = 0
+    while True:
+        batch = list(entries.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return replayed
+        failed = send_bulk(coalesce(batch), index_name)
+        if failed:
+            raise RuntimeError(f"Не удалось применить изменения постов {sorted(failed)} к индексу {index_name}")
+        last_id = batch[-1].id
+        replayed += len(batch)
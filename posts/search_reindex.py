@@ -0,0 +1,230 @@
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+
+from django.db.models import Max, Min
+from django.utils import timezone as django_timezone
+
+from posts.search_cache import bump_search_generation
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def prepare_actions(posts, index_name=None):
+    from posts.documents import PostDocument
+
+    document = PostDocument()
+    actions = [document._prepare_action(post, "index") for post in posts]
+    if index_name:
+        for action in actions:
+            action["_index"] = index_name
+    return actions
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("last_id")
+
+
+def write_checkpoint(path, last_id):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"last_id": last_id}, f)
+    os.replace(tmp_path, path)
+
+
+def iter_id_ranges(queryset, range_size, start_after=None):
+    bounds = queryset.aggregate(first=Min("id"), last=Max("id"))
+    if bounds["first"] is None:
+        return
+    start = bounds["first"] if start_after is None else start_after + 1
+    while start <= bounds["last"]:
+        end = start + range_size - 1
+        yield start, end
+        start = end + 1
+
+
+def iter_batches(queryset, batch_size):
+    batch = []
+    for post in queryset.iterator(chunk_size=batch_size):
+        batch.append(post)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reindex_posts(
+    range_size=10000,
+    batch_size=500,
+    workers=None,
+    threads=4,
+    max_in_flight=8,
+    checkpoint=None,
+    resume=False,
+    progress=None,
+    index_name=None,
+):
+    from elasticsearch.helpers import parallel_bulk
+    from posts.documents import PostDocument
+
+    document = PostDocument()
+    client = document._get_connection()
+    queryset = document.get_indexing_queryset().order_by("id")
+    start_after = read_checkpoint(checkpoint) if resume else None
+
+    indexed = 0
+    errors = 0
+    # чекпоинт означает "все id до last_id проиндексированы", поэтому после
+    # первого диапазона с ошибками он больше не сдвигается
+    checkpoint_valid = True
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as executor:
+        for start, end in iter_id_ranges(queryset, range_size, start_after):
+            range_errors = errors
+            batches = iter_batches(queryset.filter(id__gte=start, id__lte=end), batch_size)
+            prepared = executor.map(partial(prepare_actions, index_name=index_name), batches)
+            actions = (action for batch in prepared for action in batch)
+
+            for ok, item in parallel_bulk(
+                client,
+                actions,
+                thread_count=threads,
+                chunk_size=batch_size,
+                queue_size=max_in_flight,
+                raise_on_error=False,
+            ):
+                if ok:
+                    indexed += 1
+                else:
+                    errors += 1
+                    logger.error(f"Ошибка индексации при переиндексации: {item}")
+
+            if errors > range_errors:
+                if checkpoint_valid:
+                    logger.error(f"Диапазон {start}-{end} проиндексирован с ошибками, чекпоинт больше не сдвигается")
+                checkpoint_valid = False
+            if checkpoint_valid:
+                write_checkpoint(checkpoint, end)
+            if index_name is None:
+                bump_search_generation()
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress(end, indexed, errors, indexed / elapsed if elapsed else 0.0)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "indexed": indexed,
+        "errors": errors,
+        "seconds": elapsed,
+        "docs_per_second": indexed / elapsed if elapsed else 0.0,
+    }
+
+
+BUILD_INDEX_SETTINGS = {
+    "number_of_replicas": 0,
+    "refresh_interval": "-1",
+}
+
+
+def physical_index_name(alias):
+    return f"{alias}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+
+
+def create_physical_index(alias):
+    from posts.documents import PostDocument
+
+    name = physical_index_name(alias)
+    index = PostDocument._index.clone(name)
+    index.settings(**BUILD_INDEX_SETTINGS)
+    index.create()
+    return name
+
+
+def finish_physical_index(client, name):
+    from posts.documents import PostDocument
+
+    live_settings = PostDocument._index.to_dict().get("settings", {})
+    client.indices.put_settings(
+        index=name,
+        settings={
+            "number_of_replicas": live_settings.get("number_of_replicas", 1),
+            "refresh_interval": live_settings.get("refresh_interval", "1s"),
+        },
+    )
+    client.indices.refresh(index=name)
+
+
+def swap_alias(client, alias, new_index):
+    actions = []
+    old_indices = []
+
+    if client.indices.exists_alias(name=alias):
+        old_indices = list(client.indices.get_alias(name=alias).keys())
+        actions += [{"remove": {"index": index, "alias": alias}} for index in old_indices]
+    elif client.indices.exists(index=alias):
+        actions.append({"remove_index": {"index": alias}})
+
+    actions.append({"add": {"index": new_index, "alias": alias, "is_write_index": True}})
+    client.indices.update_aliases(actions=actions)
+    bump_search_generation()
+    return old_indices
+
+
+def blue_green_rebuild(keep_old=False, progress=None, **reindex_options):
+    from posts.documents import PostDocument
+    from posts.search_outbox import replay_since
+
+    if reindex_options.get("resume") or reindex_options.get("checkpoint"):
+        # чекпоинт относится к прежнему индексу: продолжение с него оставило бы новый индекс без начала
+        raise ValueError("Перестроение индекса не поддерживает продолжение с контрольной точки")
+
+    alias = PostDocument._index._name
+    client = PostDocument._get_connection()
+
+    build_started = django_timezone.now()
+    new_index = create_physical_index(alias)
+    logger.info(f"Создан индекс {new_index} для алиаса {alias}")
+
+    result = reindex_posts(index_name=new_index, progress=progress, **reindex_options)
+    if result["errors"]:
+        client.indices.delete(index=new_index)
+        raise RuntimeError(
+            f"Индекс {new_index} заполнен с ошибками ({result['errors']}), алиас {alias} не переключен, индекс удален"
+        )
+    finish_physical_index(client, new_index)
+
+    catch_up_started = django_timezone.now()
+    result["caught_up"] = replay_since(build_started, new_index)
+
+    old_indices = swap_alias(client, alias, new_index)
+    result["caught_up"] += replay_since(catch_up_started, new_index)
+
+    if not keep_old:
+        for index in old_indices:
+            client.indices.delete(index=index)
+
+    result["index"] = new_index
+    result["old_indices"] = old_indices
+    return result
@@ -1,14 +1,27 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
 import logging
-from datetime import datetime
+import time
+
+from .local_search import database_search, local_search_enabled, local_search_index
+from .models import PostRollupTotals, SearchOutboxEntry
+from .search_telemetry import search_telemetry
+from .suggestions import suggestion_index
 
 ELASTICSEARCH_AVAILABLE = getattr(settings, 'ELASTICSEARCH_AVAILABLE', False)
 
 if ELASTICSEARCH_AVAILABLE:
-    from elasticsearch import Elasticsearch
-    from django_elasticsearch_dsl.search import Search
+    from common.circuit_breaker import elasticsearch_breaker
+    from common.metrics import elasticsearch_call, metrics, record_elasticsearch_response
     from .documents import PostDocument
-    from common.kafka_client import KafkaProducer
+    from .pagination import decode_search_cursor, encode_search_cursor
+    from elasticsearch_dsl import MultiSearch
+    from .search_cache import (
+        asearch_generation, bump_search_generation, build_search_result_cache, search_cache_key, search_generation,
+    )
+    from .search_client import LazyClient, build_async_client, build_client, search_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +29,116 @@ logger = logging.getLogger(__name__)
 if ELASTICSEARCH_AVAILABLE:
     class PostSearchService:
         def __init__(self):
-            self.es_client = Elasticsearch([f"{settings.ELASTICSEARCH_HOST}:{settings.ELASTICSEARCH_PORT}"])
-            self.kafka_producer = KafkaProducer()
-    
-    def search_posts(self, query, size=20, from_=0, filters=None):
-        try:
-            search = PostDocument.search()
+            self.result_cache = build_search_result_cache()
+            # Клиенты создаются при первом запросе, а не при импорте модуля
+            self._client = LazyClient(build_client)
+            self._async_client = LazyClient(build_async_client)
+            self._async_loop = None
+
+        async def astart(self):
+            # Сессия aiohttp привязана к циклу событий, поэтому асинхронный клиент живет только
+            # в долгоживущем цикле ASGI-сервера (lifespan startup). Под WSGI у каждого async-представления
+            # свой цикл, и там поиск идет через синхронный клиент в пуле потоков
+            self._async_loop = asyncio.get_running_loop()
+
+        def _async_client_ready(self):
+            try:
+                return self._async_loop is asyncio.get_running_loop()
+            except RuntimeError:
+                return False
+
+        @property
+        def client(self):
+            return self._client.get().options(request_timeout=search_timeout())
+
+        @property
+        def async_client(self):
+            return self._async_client.get().options(request_timeout=search_timeout())
+
+        def search_posts(self, query, size=20, from_=0, filters=None, after=None, aggregations=None):
+            aggregations = tuple(sorted(set(aggregations or ())))
+            started = time.perf_counter()
+            result = self.result_cache.get_or_compute(
+                search_cache_key(query, filters, size, from_, after, aggregations),
+                lambda: self._search_posts(query, size, from_, filters, after, aggregations),
+                cacheable=lambda result: "error" not in result and not result.get("degraded"),
+            )
+            if "error" not in result:
+                search_telemetry.record(query, filters, result["total"], (time.perf_counter() - started) * 1000)
+            return dict(result, query=query, filters=filters)
+
+        async def asearch_posts(self, query, size=20, from_=0, filters=None, after=None, aggregations=None):
+            if not self._async_client_ready():
+                return await sync_to_async(self.search_posts)(query, size, from_, filters, after, aggregations)
+
+            aggregations = tuple(sorted(set(aggregations or ())))
+            started = time.perf_counter()
+            generation = await asearch_generation()
+            key = search_cache_key(query, filters, size, from_, after, aggregations)
+            result = self.result_cache.get(key, generation)
+            if result is None:
+                result = await self._asearch_posts(query, size, from_, filters, after, aggregations)
+                if "error" not in result and not result.get("degraded"):
+                    self.result_cache.put(key, generation, result)
+            if "error" not in result:
+                search_telemetry.record(query, filters, result["total"], (time.perf_counter() - started) * 1000)
+            return dict(result, query=query, filters=filters)
+
+        def _pit_options(self):
+            return {
+                "index": PostDocument._index._name,
+                "keep_alive": getattr(settings, "SEARCH_PIT_KEEP_ALIVE", "1m"),
+            }
+
+        def _open_point_in_time(self):
+            # Без снимка вторая страница все равно строится по search_after на живом индексе,
+            # поэтому ошибка открытия не должна ронять поиск
+            try:
+                with elasticsearch_call("open_pit"):
+                    response = self.client.open_point_in_time(**self._pit_options())
+                return response["id"]
+            except Exception as e:
+                logger.warning(f"Не удалось открыть point in time: {e}")
+                return None
+
+        async def _aopen_point_in_time(self):
+            try:
+                with elasticsearch_call("open_pit"):
+                    response = await self.async_client.open_point_in_time(**self._pit_options())
+                return response["id"]
+            except Exception as e:
+                logger.warning(f"Не удалось открыть point in time: {e}")
+                return None
+
+        def _close_point_in_time(self, pit_id):
+            try:
+                with elasticsearch_call("close_pit"):
+                    self.client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Не удалось закрыть point in time: {e}")
+
+        async def _aclose_point_in_time(self, pit_id):
+            try:
+                with elasticsearch_call("close_pit"):
+                    await self.async_client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                logger.warning(f"Не удалось закрыть point in time: {e}")
+
+        def _with_point_in_time(self, search, pit_id):
+            return search.index().extra(pit={
+                "id": pit_id,
+                "keep_alive": getattr(settings, "SEARCH_PIT_KEEP_ALIVE", "1m"),
+            })
+
+        def _spent_point_in_time(self, response, result, pit_id):
+            # на последней странице снимок больше не нужен
+            pit_id = getattr(response, "pit_id", None) or pit_id
+            if pit_id and "error" not in result and result["next_cursor"] is None:
+                return pit_id
+            return None
+
+        def _build_search(self, query, size, from_, filters, after=None, aggregations=()):
+            search = PostDocument.search(using=self.client)
             
             if query:
                 search = search.query(
@@ -33,7 +150,7 @@ if ELASTICSEARCH_AVAILABLE:
             
             if filters:
                 if filters.get("username"):
-                    search = search.filter("term", username=filters["username"])
+                    search = search.filter("term", **{"username.raw": filters["username"]})
                 if filters.get("date_from"):
                     search = search.filter("range", timestamp={"gte": filters["date_from"]})
                 if filters.get("date_to"):
@@ -41,118 +158,422 @@ if ELASTICSEARCH_AVAILABLE:
                 if filters.get("parent_post_id"):
                     search = search.filter("term", parent_post_id=filters["parent_post_id"])
 
-            search.aggs.bucket("usernames", "terms", field="username", size=10)
-            search.aggs.bucket("dates", "date_histogram", field="timestamp", interval="day")
+            if "usernames" in aggregations:
+                search.aggs.bucket("usernames", "terms", field="username.raw", size=10)
+            if "dates" in aggregations:
+                search.aggs.bucket("dates", "date_histogram", field="timestamp", calendar_interval="day")
 
-            response = search[from_:from_ + size].execute()
+            # id - стабильный тайбрейкер для search_after
+            search = search.sort({"_score" if query else "timestamp": "desc"}, {"id": "desc"})
+            pit_id = None
+            if after:
+                search_after, pit_id = decode_search_cursor(after)
+                search = search.extra(search_after=search_after, size=size + 1)
+                if pit_id:
+                    search = self._with_point_in_time(search, pit_id)
+            else:
+                search = search[from_:from_ + size + 1]
+            return search, pit_id
 
-            self._log_search_query(query, filters, len(response.hits))
-            
+        def _search_result(self, response, query, size, filters, pit_id, aggregations):
+            record_elasticsearch_response("search", response)
+
+            hits = list(response.hits)
+            next_cursor = None
+            if len(hits) > size:
+                hits = hits[:size]
+                # курсор первой страницы несет только значения сортировки, снимок открывается со второй
+                pit_id = getattr(response, "pit_id", None) or pit_id
+                next_cursor = encode_search_cursor(hits[-1].meta.sort, pit_id)
+        
             return {
-                "hits": [hit.to_dict() for hit in response.hits],
+                "hits": [dict(hit.to_dict(), score=hit.meta.score) for hit in hits],
                 "total": response.hits.total.value,
-                "aggregations": response.aggregations.to_dict(),
+                "aggregations": response.aggregations.to_dict() if aggregations else None,
+                "next_cursor": next_cursor,
                 "query": query,
                 "filters": filters
             }
-            
-        except Exception as e:
-            logger.error(f"Ошибка поиска в Elasticsearch: {e}")
-            return {"error": str(e), "hits": [], "total": 0}
-    
-    def suggest_posts(self, query, size=5):
-        try:
-            search = PostDocument.search()
-            search = search.suggest("suggestions", query, {
-                "completion": {
-                    "field": "text",
-                    "size": size,
-                    "skip_duplicates": True
-                }
+
+        def _degraded_search(self, query, size, from_, filters, after=None, aggregations=()):
+            metrics.counter("search_degraded_total").inc()
+            try:
+                return dict(database_search(query, size, from_, filters, after, aggregations), degraded=True)
+            except Exception as e:
+                logger.error(f"Ошибка резервного поиска по базе данных: {e}")
+                return {"error": str(e), "hits": [], "total": 0}
+
+        def _search_posts(self, query, size, from_, filters, after=None, aggregations=()):
+            try:
+                search, pit_id = self._build_search(query, size, from_, filters, after, aggregations)
+            except Exception as e:
+                logger.error(f"Ошибка поиска в Elasticsearch: {e}")
+                return {"error": str(e), "hits": [], "total": 0}
+
+            if not elasticsearch_breaker.allow():
+                return self._degraded_search(query, size, from_, filters, after, aggregations)
+            if after and not pit_id:
+                pit_id = self._open_point_in_time()
+                if pit_id:
+                    search = self._with_point_in_time(search, pit_id)
+            try:
+                with elasticsearch_breaker.measure():
+                    with elasticsearch_call("search"):
+                        response = search.execute()
+                    result = self._search_result(response, query, size, filters, pit_id, aggregations)
+
+            except Exception as e:
+                logger.error(f"Ошибка поиска в Elasticsearch: {e}")
+                return self._degraded_search(query, size, from_, filters, after, aggregations)
+
+            spent_pit_id = self._spent_point_in_time(response, result, pit_id)
+            if spent_pit_id:
+                self._close_point_in_time(spent_pit_id)
+            return result
+
+        async def _asearch_posts(self, query, size, from_, filters, after=None, aggregations=()):
+            try:
+                search, pit_id = self._build_search(query, size, from_, filters, after, aggregations)
+            except Exception as e:
+                logger.error(f"Ошибка поиска в Elasticsearch: {e}")
+                return {"error": str(e), "hits": [], "total": 0}
+
+            degraded_search = sync_to_async(self._degraded_search)
+            if not elasticsearch_breaker.allow():
+                return await degraded_search(query, size, from_, filters, after, aggregations)
+            if after and not pit_id:
+                pit_id = await self._aopen_point_in_time()
+                if pit_id:
+                    search = self._with_point_in_time(search, pit_id)
+            try:
+                with elasticsearch_breaker.measure():
+                    with elasticsearch_call("search"):
+                        raw = await self.async_client.search(index=search._index, body=search.to_dict())
+                    response = search._response_class(search, raw.body)
+                    result = self._search_result(response, query, size, filters, pit_id, aggregations)
+
+            except Exception as e:
+                logger.error(f"Ошибка поиска в Elasticsearch: {e}")
+                return await degraded_search(query, size, from_, filters, after, aggregations)
+
+            spent_pit_id = self._spent_point_in_time(response, result, pit_id)
+            if spent_pit_id:
+                await self._aclose_point_in_time(spent_pit_id)
+            return result
+
+        def _build_suggest(self, query, size):
+            search = PostDocument.search(using=self.client).extra(size=0, _source=False)
+            return search.suggest("suggestions", query, completion={
+                "field": "suggest",
+                "size": size,
+                "skip_duplicates": True
             })
-            
-            response = search.execute()
-            suggestions = []
-            
+
+        def _suggest_result(self, response, suggestions, size):
+            suggestions = list(suggestions)
             if hasattr(response, "suggest") and "suggestions" in response.suggest:
                 for suggestion in response.suggest.suggestions:
                     for option in suggestion.options:
-                        suggestions.append(option.text)
-            
-            return suggestions
-            
-        except Exception as e:
-            logger.error(f"Ошибка автодополнения: {e}")
-            return []
+                        if option.text not in suggestions:
+                            suggestions.append(option.text)
+            return suggestions[:size]
     
-    def index_post(self, post):
-        try:
-            PostDocument.update(post)
-            logger.info(f"Пост {post.id} проиндексирован в Elasticsearch")
-        except Exception as e:
-            logger.error(f"Ошибка индексации поста {post.id}: {e}")
+        def suggest_posts(self, query, size=5):
+            suggestions = suggestion_index.lookup(query or "", size)
+            if len(suggestions) >= size or not query or not elasticsearch_breaker.allow():
+                return suggestions
+
+            try:
+                with elasticsearch_breaker.measure(), elasticsearch_call("suggest"):
+                    response = self._build_suggest(query, size).execute()
+                return self._suggest_result(response, suggestions, size)
+
+            except Exception as e:
+                logger.error(f"Ошибка автодополнения: {e}")
+                return suggestions
+
+        async def asuggest_posts(self, query, size=5):
+            suggestions = await suggestion_index.alookup(query or "", size)
+            if len(suggestions) >= size or not query:
+                return suggestions
+            if not self._async_client_ready():
+                return await sync_to_async(self.suggest_posts)(query, size)
+            if not elasticsearch_breaker.allow():
+                return suggestions
+
+            try:
+                search = self._build_suggest(query, size)
+                with elasticsearch_breaker.measure(), elasticsearch_call("suggest"):
+                    raw = await self.async_client.search(index=search._index, body=search.to_dict())
+                return self._suggest_result(search._response_class(search, raw.body), suggestions, size)
+
+            except Exception as e:
+                logger.error(f"Ошибка автодополнения: {e}")
+                return suggestions
+
+        def _plan_multi_search(self, searches, suggestions, generation):
+            search_results = [None] * len(searches)
+            suggestion_results = [None] * len(suggestions)
+            pending = []
+
+            for position, params in enumerate(searches):
+                params = dict(params, aggregations=tuple(sorted(set(params.get("aggregations") or ()))))
+                key = search_cache_key(
+                    params["query"], params["filters"], params["size"], params["from_"],
+                    params["after"], params["aggregations"],
+                )
+                cached = self.result_cache.get(key, generation)
+                if cached is not None:
+                    search_results[position] = cached
+                    continue
+                try:
+                    search, pit_id = self._build_search(**params)
+                except Exception as e:
+                    search_results[position] = {"error": str(e), "hits": [], "total": 0}
+                    continue
+                pending.append(("search", position, search, (key, params, pit_id)))
+
+            for position, params in enumerate(suggestions):
+                local = suggestion_index.lookup(params["query"] or "", params["size"])
+                if len(local) >= params["size"] or not params["query"]:
+                    suggestion_results[position] = local
+                    continue
+                pending.append(("suggest", position, self._build_suggest(params["query"], params["size"]), (local, params)))
+
+            return search_results, suggestion_results, pending
+
+        def _missing_points_in_time(self, plan):
+            # снимок открывается только для запросов следующих страниц, у курсора которых его еще нет
+            return [
+                kind == "search" and bool(context[1]["after"]) and not context[2]
+                for kind, _, _, context in plan[2]
+            ]
+
+        def _attach_points_in_time(self, plan, pit_ids):
+            search_results, suggestion_results, pending = plan
+            attached = []
+            for entry, pit_id in zip(pending, pit_ids):
+                kind, position, search, context = entry
+                if pit_id:
+                    key, params, _ = context
+                    entry = (kind, position, self._with_point_in_time(search, pit_id), (key, params, pit_id))
+                attached.append(entry)
+            return search_results, suggestion_results, attached
+
+        def _finish_multi_search(self, plan, responses, generation, started, searches):
+            search_results, suggestion_results, pending = plan
+            spent_pit_ids = []
+            for (kind, position, _, context), response in zip(pending, responses):
+                if kind == "search":
+                    key, params, pit_id = context
+                    if response is None:
+                        search_results[position] = self._degraded_search(**params)
+                        continue
+                    try:
+                        result = self._search_result(
+                            response, params["query"], params["size"], params["filters"],
+                            pit_id, params["aggregations"],
+                        )
+                    except Exception as e:
+                        logger.error(f"Ошибка поиска в Elasticsearch: {e}")
+                        result = self._degraded_search(**params)
+                    else:
+                        self.result_cache.put(key, generation, result)
+                        spent_pit_id = self._spent_point_in_time(response, result, pit_id)
+                        if spent_pit_id:
+                            spent_pit_ids.append(spent_pit_id)
+                    search_results[position] = result
+                else:
+                    local, params = context
+                    suggestion_results[position] = (
+                        self._suggest_result(response, local, params["size"]) if response is not None else local
+                    )
+
+            latency_ms = (time.perf_counter() - started) * 1000
+            for params, result in zip(searches, search_results):
+                if "error" not in result:
+                    search_telemetry.record(params["query"], params["filters"], result["total"], latency_ms)
+            return (
+                [dict(result, query=params["query"], filters=params["filters"])
+                 for params, result in zip(searches, search_results)],
+                suggestion_results,
+                spent_pit_ids,
+            )
+
+        def multi_search(self, searches=(), suggestions=()):
+            started = time.perf_counter()
+            generation = search_generation()
+            plan = self._plan_multi_search(searches, suggestions, generation)
+            pending = plan[2]
+
+            responses = []
+            if pending and not elasticsearch_breaker.allow():
+                responses = [None] * len(pending)
+            elif pending:
+                plan = self._attach_points_in_time(plan, [
+                    self._open_point_in_time() if missing else None
+                    for missing in self._missing_points_in_time(plan)
+                ])
+                pending = plan[2]
+                multi = MultiSearch(using=self.client)
+                for _, _, search, _ in pending:
+                    multi = multi.add(search)
+                try:
+                    with elasticsearch_breaker.measure(), elasticsearch_call("msearch"):
+                        responses = multi.execute(raise_on_error=False)
+                except Exception as e:
+                    logger.error(f"Ошибка пакетного поиска в Elasticsearch: {e}")
+                    responses = [None] * len(pending)
+
+            search_results, suggestion_results, spent_pit_ids = self._finish_multi_search(
+                plan, responses, generation, started, searches
+            )
+            for pit_id in spent_pit_ids:
+                self._close_point_in_time(pit_id)
+            return search_results, suggestion_results
+
+        async def amulti_search(self, searches=(), suggestions=()):
+            if not self._async_client_ready():
+                return await sync_to_async(self.multi_search)(searches, suggestions)
+
+            started = time.perf_counter()
+            generation = await asearch_generation()
+            if suggestions:
+                await suggestion_index.acurrent()
+            plan = self._plan_multi_search(searches, suggestions, generation)
+            pending = plan[2]
+
+            responses = []
+            if pending and not elasticsearch_breaker.allow():
+                responses = [None] * len(pending)
+            elif pending:
+                pit_ids = []
+                for missing in self._missing_points_in_time(plan):
+                    pit_ids.append(await self._aopen_point_in_time() if missing else None)
+                plan = self._attach_points_in_time(plan, pit_ids)
+                pending = plan[2]
+                multi = MultiSearch()
+                for _, _, search, _ in pending:
+                    multi = multi.add(search)
+                try:
+                    with elasticsearch_breaker.measure():
+                        with elasticsearch_call("msearch"):
+                            raw = await self.async_client.msearch(body=multi.to_dict())
+                        responses = [
+                            None if item.get("error") else search._response_class(search, item)
+                            for (_, _, search, _), item in zip(pending, raw["responses"])
+                        ]
+                except Exception as e:
+                    logger.error(f"Ошибка пакетного поиска в Elasticsearch: {e}")
+                    responses = [None] * len(pending)
+
+            if any(response is None for response in responses):
+                # Резервный поиск идет в базу данных, которой нельзя пользоваться из цикла событий
+                finished = await sync_to_async(self._finish_multi_search)(
+                    plan, responses, generation, started, searches
+                )
+            else:
+                finished = self._finish_multi_search(plan, responses, generation, started, searches)
+            search_results, suggestion_results, spent_pit_ids = finished
+            for pit_id in spent_pit_ids:
+                await self._aclose_point_in_time(pit_id)
+            return search_results, suggestion_results
+
+        async def aclose(self):
+            self._async_loop = None
+            client = self._async_client.reset()
+            if client is not None:
+                await client.close()
+            client = self._client.reset()
+            if client is not None:
+                client.close()
     
-    def remove_post(self, post_id):
-        try:
-            PostDocument.get(id=post_id).delete()
-            logger.info(f"Пост {post_id} удален из Elasticsearch")
-        except Exception as e:
-            logger.error(f"Ошибка удаления поста {post_id}: {e}")
+        def _buffer_write(self, post_id, action):
+            # Изменение дождется восстановления кластера в outbox, его применит search_outbox_relay
+            SearchOutboxEntry.enqueue(post_id, action)
+            metrics.counter("search_writes_buffered_total").inc()
+
+        def index_post(self, post):
+            if not elasticsearch_breaker.allow():
+                self._buffer_write(post.id, SearchOutboxEntry.ACTION_INDEX)
+                return
+            try:
+                with elasticsearch_breaker.measure(), elasticsearch_call("index"):
+                    PostDocument().update(post)
+                bump_search_generation()
+                logger.info(f"Пост {post.id} проиндексирован в Elasticsearch")
+            except Exception as e:
+                logger.error(f"Ошибка индексации поста {post.id}: {e}")
+                self._buffer_write(post.id, SearchOutboxEntry.ACTION_INDEX)
     
-    def _log_search_query(self, query, filters, results_count):
-        try:
-            search_log = {
-                "type": "search_query",
-                "query": query,
-                "filters": filters,
-                "results_count": results_count,
-                "timestamp": str(datetime.now())
-            }
-            
-            self.kafka_producer.send_message(
-                topic=settings.KAFKA_POSTS_TOPIC,
-                message=search_log
-            )
-        except Exception as e:
-            logger.error(f"Ошибка логирования поискового запроса в Kafka: {e}")
+        def remove_post(self, post_id):
+            if not elasticsearch_breaker.allow():
+                self._buffer_write(post_id, SearchOutboxEntry.ACTION_DELETE)
+                return
+            try:
+                with elasticsearch_breaker.measure(), elasticsearch_call("delete"):
+                    self.client.options(ignore_status=404).delete(index=PostDocument._index._name, id=post_id)
+                bump_search_generation()
+                logger.info(f"Пост {post_id} удален из Elasticsearch")
+            except Exception as e:
+                logger.error(f"Ошибка удаления поста {post_id}: {e}")
+                self._buffer_write(post_id, SearchOutboxEntry.ACTION_DELETE)
     
-    def get_search_statistics(self):
-        try:
-            search = PostDocument.search()
-            search = search.aggs.bucket("total_posts", "value_count", field="id")
-            search = search.aggs.bucket("unique_users", "cardinality", field="username")
-            search = search.aggs.bucket("posts_by_date", "date_histogram", field="timestamp", interval="day")
-            
-            response = search.execute()
-            
-            return {
-                "total_posts": response.aggregations.total_posts.value,
-                "unique_users": response.aggregations.unique_users.value,
-                "posts_by_date": response.aggregations.posts_by_date.buckets
-            }
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения статистики: {e}")
-            return {}
+        def get_search_statistics(self):
+            return PostRollupTotals.snapshot()
 
 
     post_search_service = PostSearchService()
 else:
     class PostSearchService:
-        def search_posts(self, query, size=20, from_=0, filters=None):
-            return {"error": "Elasticsearch недоступен", "hits": [], "total": 0}
+        def search_posts(self, query, size=20, from_=0, filters=None, after=None, aggregations=None):
+            started = time.perf_counter()
+            try:
+                if local_search_enabled():
+                    result = local_search_index.search(query, size, from_, filters, after, aggregations)
+                else:
+                    result = dict(database_search(query, size, from_, filters, after, aggregations), degraded=True)
+            except Exception as e:
+                logger.error(f"Ошибка локального поиска: {e}")
+                return {"error": str(e), "hits": [], "total": 0}
+
+            search_telemetry.record(query, filters, result["total"], (time.perf_counter() - started) * 1000)
+            return dict(result, query=query, filters=filters)
         
         def suggest_posts(self, query, size=5):
-            return []
+            return suggestion_index.lookup(query or "", size)
+
+        def multi_search(self, searches=(), suggestions=()):
+            return (
+                [self.search_posts(**params) for params in searches],
+                [self.suggest_posts(**params) for params in suggestions],
+            )
+
+        # FTS5 живет в той же SQLite, поэтому асинхронные варианты уходят в пул потоков Django
+        async def asearch_posts(self, query, size=20, from_=0, filters=None, after=None, aggregations=None):
+            return await sync_to_async(self.search_posts)(query, size, from_, filters, after, aggregations)
+
+        async def asuggest_posts(self, query, size=5):
+            return await suggestion_index.alookup(query or "", size)
+
+        async def amulti_search(self, searches=(), suggestions=()):
+            return await sync_to_async(self.multi_search)(searches, suggestions)
+
+        async def astart(self):
+            pass
+
+        async def aclose(self):
+            pass
         
         def index_post(self, post):
-            pass
+            if local_search_enabled():
+                local_search_index.index_post(post)
         
         def remove_post(self, post_id):
-            pass
+            if local_search_enabled():
+                local_search_index.remove_post(post_id)
         
         def get_search_statistics(self):
-            return {"error": "Elasticsearch недоступен"}
+            return PostRollupTotals.snapshot()
 
     post_search_service = PostSearchService()
-
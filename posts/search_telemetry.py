@@ -0,0 +1,159 @@
+import atexit
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+OTHER_QUERIES = "__other__"
+
+_whitespace = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    return _whitespace.sub(" ", (query or "").strip().lower())
+
+
+def latency_bucket(latency_ms):
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if latency_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+class QueryStats:
+    __slots__ = ("count", "zero_results", "latency_ms_sum", "latency_buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.zero_results = 0
+        self.latency_ms_sum = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, results_count, latency_ms):
+        self.count += 1
+        if not results_count:
+            self.zero_results += 1
+        self.latency_ms_sum += latency_ms
+        self.latency_buckets[latency_bucket(latency_ms)] += 1
+
+    def to_dict(self, query):
+        return {
+            "query": query,
+            "count": self.count,
+            "zero_results": self.zero_results,
+            "latency_ms_sum": round(self.latency_ms_sum, 3),
+            "latency_buckets": self.latency_buckets,
+        }
+
+
+class SearchTelemetry:
+    def __init__(self, window_seconds=60, sample_rate=0.01, max_samples=100, max_queries=1000, sink=None):
+        self.window_seconds = window_seconds
+        self.sample_rate = sample_rate
+        self.max_samples = max_samples
+        self.max_queries = max_queries
+        self.sink = sink or send_rollup
+        self.lock = threading.Lock()
+        self.flusher = None
+        self.stop_event = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self.window_start = time.time()
+        self.queries = {}
+        self.samples = []
+
+    def _ensure_flusher(self):
+        if self.flusher is None or not self.flusher.is_alive():
+            self.stop_event.clear()
+            self.flusher = threading.Thread(target=self._run_flusher, name="search-telemetry", daemon=True)
+            self.flusher.start()
+
+    def record(self, query, filters, results_count, latency_ms):
+        normalized = normalize_query(query)
+        sample = random.random() < self.sample_rate
+
+        with self.lock:
+            self._ensure_flusher()
+            stats = self.queries.get(normalized)
+            if stats is None:
+                if len(self.queries) >= self.max_queries:
+                    normalized = OTHER_QUERIES
+                stats = self.queries.setdefault(normalized, QueryStats())
+            stats.add(results_count, latency_ms)
+
+            if sample and len(self.samples) < self.max_samples:
+                self.samples.append({
+                    "type": "search_query",
+                    "query": query,
+                    "filters": filters,
+                    "results_count": results_count,
+                    "latency_ms": round(latency_ms, 3),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                })
+
+    def flush(self):
+        with self.lock:
+            queries, samples, window_start = self.queries, self.samples, self.window_start
+            self._reset()
+        if not queries:
+            return None
+
+        rollup = {
+            "type": "search_query_rollup",
+            "window_start": datetime.fromtimestamp(window_start, timezone.utc).isoformat(),
+            "window_end": datetime.now(timezone.utc).isoformat(),
+            "latency_buckets_ms": list(LATENCY_BUCKETS_MS),
+            "queries": [stats.to_dict(query) for query, stats in queries.items()],
+        }
+        try:
+            self.sink(rollup, samples)
+        except Exception as e:
+            logger.error(f"Ошибка отправки статистики поисковых запросов: {e}")
+        return rollup
+
+    def _run_flusher(self):
+        while not self.stop_event.wait(self.window_seconds):
+            self.flush()
+
+    def close(self):
+        self.stop_event.set()
+        if self.flusher is not None:
+            self.flusher.join(timeout=self.window_seconds)
+            self.flusher = None
+        self.flush()
+
+
+def send_rollup(rollup, samples):
+    if not getattr(settings, "KAFKA_AVAILABLE", False):
+        return
+
+    from common.kafka_client import kafka_producer
+
+    topic = getattr(settings, "KAFKA_POSTS_TOPIC", "posts")
+    kafka_producer.send_message(topic, rollup)
+    for sample in samples:
+        kafka_producer.send_message(topic, sample)
+
+
+def build_search_telemetry():
+    config = getattr(settings, "SEARCH_TELEMETRY", {})
+    return SearchTelemetry(
+        window_seconds=config.get("window_seconds", 60),
+        sample_rate=config.get("sample_rate", 0.01),
+        max_samples=config.get("max_samples", 100),
+        max_queries=config.get("max_queries", 1000),
+    )
+
+
+search_telemetry = build_search_telemetry()
+# atexit вызывает обработчики в обратном порядке: kafka_client импортирован раньше (CommonConfig.ready),
+# поэтому накопленная статистика уходит до закрытия producer'а
+atexit.register(search_telemetry.close)
@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Post
+from .local_search import local_search_enabled, local_search_index
+from .models import MediaBlob, Post, PostRollupTotals, SearchOutboxEntry
 import logging
 
 KAFKA_AVAILABLE = getattr(settings, 'KAFKA_AVAILABLE', False)
@@ -12,24 +16,45 @@ if KAFKA_AVAILABLE:
 logger = logging.getLogger(__name__)
 
 
+def send_post_created(instance):
+    post_data = {
+        "id": instance.id,
+        "username": instance.username,
+        "email": instance.email,
+        "text": instance.text,
+        "timestamp": instance.timestamp.isoformat() if instance.timestamp else None,
+        "image": str(instance.image) if instance.image else None,
+        "text_file": str(instance.text_file) if instance.text_file else None,
+        "parent_post_id": instance.parent_post_id,
+    }
+
+    success = send_post_created_message(post_data)
+    if success:
+        logger.info(f"Сообщение о новом посте {instance.id} успешно отправлено в Kafka")
+    else:
+        logger.error(f"Ошибка отправки сообщения о посте {instance.id} в Kafka")
+
+
 @receiver(post_save, sender=Post)
 def after_post_save(sender, instance, created, **kwargs):
     if created and KAFKA_AVAILABLE:
-        post_data = {
-            "id": instance.id,
-            "username": instance.username,
-            "email": instance.email,
-            "text": instance.text,
-            "timestamp": instance.timestamp.isoformat() if instance.timestamp else None,
-            "image": str(instance.image) if instance.image else None,
-            "text_file": str(instance.text_file) if instance.text_file else None,
-            "parent_post_id": instance.parent_post.id if instance.parent_post else None,
-        }
-
-        success = send_post_created_message(post_data)
-        if success:
-            logger.info(f"Сообщение о новом посте {instance.id} успешно отправлено в Kafka")
-        else:
-            logger.error(f"Ошибка отправки сообщения о посте {instance.id} в Kafka")
+        # Post.save работает в транзакции: событие уходит после фиксации, когда пост уже виден потребителям
+        transaction.on_commit(partial(send_post_created, instance))
     elif created:
-        logger.info(f"Пост {instance.id} создан, но Kafka недоступна")
\ No newline at end of file
+        logger.info(f"Пост {instance.id} создан, но Kafka недоступна")
+
+
+@receiver(post_delete, sender=Post)
+def after_post_delete(sender, instance, **kwargs):
+    # Сигнал срабатывает и при удалении через queryset или админку, в обход Post.delete
+    if instance.parent_post_id:
+        Post._update_reply_stats(instance.parent_post_id, -1)
+        Post._bump_thread_version(instance.thread_root_id)
+    SearchOutboxEntry.enqueue(instance.pk, SearchOutboxEntry.ACTION_DELETE)
+    PostRollupTotals.record(instance.username, instance.timestamp, -1)
+    if local_search_enabled():
+        local_search_index.remove_post(instance.pk)
+
+    for field_file in (instance.image, instance.text_file):
+        if field_file:
+            MediaBlob.release(field_file.name)
@@ -0,0 +1,148 @@
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count
+from django.utils.html import strip_tags
+
+from posts.models import Post
+
+logger = logging.getLogger(__name__)
+
+TERM_RE = re.compile(r"\w{3,}", re.UNICODE)
+MAX_SUGGEST_INPUTS = 20
+SCAN_LIMIT = 256
+
+
+def extract_terms(text):
+    return [term.lower() for term in TERM_RE.findall(strip_tags(text or ""))]
+
+
+def suggest_inputs(post):
+    terms = list(dict.fromkeys(extract_terms(post.text)))[:MAX_SUGGEST_INPUTS]
+    return [
+        {"input": [post.username], "weight": 10},
+        {"input": terms or [post.username], "weight": 1},
+    ]
+
+
+class PrefixIndex:
+    def __init__(self, weights, top_k=10):
+        self.top_k = top_k
+        self.terms = sorted(weights)
+        self.weights = [weights[term] for term in self.terms]
+        self.short_prefixes = {}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _top(self, start, end, limit):
+        candidates = range(start, end)
+        return [self.terms[i] for i in heapq.nlargest(limit, candidates, key=lambda i: (self.weights[i], -i))]
+
+    def lookup(self, prefix, limit=5):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff", start)
+        if end - start <= SCAN_LIMIT or limit > self.top_k:
+            return self._top(start, end, limit)
+
+        # Для коротких префиксов диапазон большой, поэтому лучшие термы запоминаются
+        cached = self.short_prefixes.get(prefix)
+        if cached is None:
+            cached = self.short_prefixes[prefix] = self._top(start, end, self.top_k)
+        return cached[:limit]
+
+
+def collect_weights(recent_posts, max_terms, username_weight):
+    counts = Counter()
+    texts = Post.objects.order_by("-id").values_list("text", flat=True)[:recent_posts]
+    for text in texts:
+        counts.update(set(extract_terms(text)))
+    weights = dict(counts.most_common(max_terms))
+
+    usernames = (
+        Post.objects.values("username")
+        .annotate(posts=Count("id"))
+        .order_by("-posts")[:max_terms]
+    )
+    for row in usernames:
+        name = row["username"].lower()
+        weights[name] = weights.get(name, 0) + row["posts"] * username_weight
+    return weights
+
+
+class SuggestionIndex:
+    def __init__(self, refresh_interval=300, recent_posts=5000, max_terms=50000, username_weight=5):
+        self.refresh_interval = refresh_interval
+        self.recent_posts = recent_posts
+        self.max_terms = max_terms
+        self.username_weight = username_weight
+        self.index = None
+        self.built_at = 0.0
+        self.refreshing = False
+        self.lock = threading.Lock()
+
+    def rebuild(self):
+        started = time.perf_counter()
+        index = PrefixIndex(collect_weights(self.recent_posts, self.max_terms, self.username_weight))
+        self.index = index
+        self.built_at = time.monotonic()
+        logger.info(f"Индекс подсказок перестроен: {len(index)} термов за {time.perf_counter() - started:.2f} с")
+        return index
+
+    def _refresh_in_background(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"Ошибка обновления индекса подсказок: {e}")
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+    def current(self):
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    return self.rebuild()
+
+        if time.monotonic() - self.built_at > self.refresh_interval:
+            with self.lock:
+                start = not self.refreshing
+                self.refreshing = True
+            if start:
+                threading.Thread(target=self._refresh_in_background, name="suggestions-refresh", daemon=True).start()
+        return self.index
+
+    def lookup(self, prefix, limit=5):
+        return self.current().lookup(prefix, limit)
+
+    async def acurrent(self):
+        # Первая сборка читает БД, поэтому в асинхронном контексте уходит в поток
+        if self.index is None:
+            return await sync_to_async(self.current)()
+        return self.current()
+
+    async def alookup(self, prefix, limit=5):
+        return (await self.acurrent()).lookup(prefix, limit)
+
+
+def build_suggestion_index():
+    config = getattr(settings, "SEARCH_SUGGESTIONS", {})
+    return SuggestionIndex(
+        refresh_interval=config.get("refresh_interval", 300),
+        recent_posts=config.get("recent_posts", 5000),
+        max_terms=config.get("max_terms", 50000),
+        username_weight=config.get("username_weight", 5),
+    )
+
+
+suggestion_index = build_suggestion_index()
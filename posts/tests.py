@@ -0,0 +1,153 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from common.kafka_memory import InMemoryBroker
+from posts.event_worker import PostEventWorker
+from posts.models import Post, SearchOutboxEntry
+from posts.search_telemetry import SearchTelemetry
+
+TOPIC = "posts"
+
+
+class PostDeleteTests(TestCase):
+    def setUp(self):
+        self.root = Post.objects.create(username="root", email="root@example.com", text="корень")
+        self.reply = Post.objects.create(
+            username="reply", email="reply@example.com", text="ответ", parent_post=self.root
+        )
+
+    def test_queryset_delete_updates_parent_stats_and_thread_version(self):
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.reply_count, 1)
+        version = self.root.thread_version
+
+        Post.objects.filter(pk=self.reply.pk).delete()
+
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.reply_count, 0)
+        self.assertIsNone(self.root.last_reply_at)
+        self.assertGreater(self.root.thread_version, version)
+
+    def test_instance_delete_updates_stats_once(self):
+        self.reply.delete()
+
+        self.root.refresh_from_db()
+        self.assertEqual(self.root.reply_count, 0)
+
+
+class FailingWorker(PostEventWorker):
+    def index_posts(self, post_ids):
+        raise RuntimeError("Elasticsearch недоступен")
+
+
+class PostEventWorkerTests(TestCase):
+    def setUp(self):
+        self.broker = InMemoryBroker(partitions=2)
+        self.posts = [
+            Post.objects.create(username=f"user{i}", email=f"user{i}@example.com", text=f"пост {i}")
+            for i in range(3)
+        ]
+        for post in self.posts:
+            self.broker.publish(TOPIC, {"event_type": "post_created", "post_id": post.pk}, key=str(post.pk))
+
+    def consumer(self):
+        return self.broker.consumer(TOPIC, "posts-workers")
+
+    def test_batch_commits_offsets(self):
+        worker = PostEventWorker(self.consumer(), index=False, process_media=False)
+
+        self.assertEqual(worker.process_batch(), 3)
+        self.assertEqual(PostEventWorker(self.consumer(), index=False, process_media=False).process_batch(), 0)
+
+    def test_failed_batch_is_rewound_and_not_committed(self):
+        worker = FailingWorker(self.consumer(), index=False, process_media=False)
+        worker.index = True
+
+        with self.assertRaises(RuntimeError):
+            worker.process_batch()
+
+        self.assertEqual(len(worker.poll()), 3)
+        self.assertEqual(PostEventWorker(self.consumer(), index=False, process_media=False).process_batch(), 3)
+
+    def test_images_are_left_to_the_pool_in_pool_mode(self):
+        with override_settings(POSTS_IMAGE_PROCESSING="pool"):
+            self.assertFalse(PostEventWorker(self.consumer()).process_media)
+        with override_settings(POSTS_IMAGE_PROCESSING="consumer"):
+            self.assertTrue(PostEventWorker(self.consumer()).process_media)
+
+    def test_index_marks_only_entries_read_before_indexing(self):
+        indexed, deleted = self.posts[0], self.posts[1]
+        index_entry = SearchOutboxEntry.objects.create(post_id=indexed.pk, action=SearchOutboxEntry.ACTION_INDEX)
+        delete_entry = SearchOutboxEntry.objects.create(post_id=deleted.pk, action=SearchOutboxEntry.ACTION_DELETE)
+
+        def send_bulk(latest):
+            # правка, зафиксированная после чтения outbox, остается relay
+            SearchOutboxEntry.objects.create(post_id=indexed.pk, action=SearchOutboxEntry.ACTION_INDEX)
+            return set()
+
+        worker = PostEventWorker(self.consumer(), process_media=False)
+        with mock.patch("posts.search_outbox.send_bulk", side_effect=send_bulk):
+            worker.index_posts([indexed.pk, deleted.pk])
+
+        pending = SearchOutboxEntry.objects.filter(processed_at__isnull=True)
+        self.assertFalse(pending.filter(pk=index_entry.pk).exists())
+        self.assertTrue(pending.filter(pk=delete_entry.pk).exists())
+        self.assertEqual(pending.filter(post_id=indexed.pk).count(), 1)
+
+
+class SearchApiTests(TestCase):
+    def setUp(self):
+        Post.objects.create(username="author", email="author@example.com", text="поиск по постам")
+
+    def test_search_requires_login(self):
+        self.assertEqual(self.client.get("/api/search/", {"q": "поиск"}).status_code, 302)
+        self.assertEqual(self.client.get("/api/search/suggest/", {"q": "по"}).status_code, 302)
+
+    def test_search_hits_do_not_expose_email(self):
+        user = get_user_model().objects.create_user("reader", password="password")
+        self.client.force_login(user)
+
+        response = self.client.get("/api/search/", {"q": "поиск"})
+
+        self.assertEqual(response.status_code, 200)
+        hits = response.json()["hits"]
+        self.assertTrue(hits)
+        self.assertTrue(all("email" not in hit for hit in hits))
+
+
+class SearchTelemetryTests(SimpleTestCase):
+    def test_close_flushes_buffered_queries(self):
+        sent = []
+        telemetry = SearchTelemetry(window_seconds=60, sample_rate=0, sink=lambda rollup, samples: sent.append(rollup))
+
+        telemetry.record("Django  Kafka", None, 3, 12.0)
+        telemetry.close()
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(sent[0]["queries"][0]["query"], "django kafka")
+
+
+class ThreadPositionTests(TestCase):
+    def test_moving_a_reply_leaves_other_threads_alone(self):
+        first = Post.objects.create(username="a", email="a@example.com", text="первая ветка")
+        reply = Post.objects.create(username="b", email="b@example.com", text="ответ", parent_post=first)
+        nested = Post.objects.create(username="c", email="c@example.com", text="ответ на ответ", parent_post=reply)
+        second = Post.objects.create(username="d", email="d@example.com", text="вторая ветка")
+        target = Post.objects.create(username="e", email="e@example.com", text="новое место")
+        reply.refresh_from_db()
+        # путь чужой ветки с тем же префиксом (например, из старых данных)
+        foreign_path = reply.thread_path + "9999999999/"
+        foreign = Post.objects.create(username="f", email="f@example.com", text="чужая", parent_post=second)
+        Post.objects.filter(pk=foreign.pk).update(thread_path=foreign_path)
+
+        reply.parent_post = target
+        reply.save()
+
+        nested.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual(nested.thread_root_id, target.pk)
+        self.assertTrue(nested.thread_path.startswith(target.thread_path))
+        self.assertEqual(foreign.thread_path, foreign_path)
+        self.assertEqual(foreign.thread_root_id, second.pk)
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from posts.models import Post
+
+CSRF_PLACEHOLDER = "__thread_csrf_token__"
+
+
+def thread_cache_key(root_post):
+    return f"posts:thread:{root_post.id}:{root_post.thread_version}"
+
+
+def render_thread(thread_posts):
+    for post in thread_posts:
+        post.level = post.depth * 2
+        post.has_answer_btn = post.reply_count == 0
+
+    return render_to_string("posts/thread.html", {
+        "thread_posts": thread_posts,
+        "csrf_placeholder": CSRF_PLACEHOLDER,
+    })
+
+
+def render_threads(root_posts, request):
+    timeout = getattr(settings, "POSTS_THREAD_CACHE_TIMEOUT", 60 * 60)
+    keys = {root_post.id: thread_cache_key(root_post) for root_post in root_posts}
+    fragments = cache.get_many(keys.values())
+
+    missing = {root_post.id: root_post for root_post in root_posts if keys[root_post.id] not in fragments}
+    if missing:
+        threads = {root_id: [] for root_id in missing}
+        thread_posts = Post.objects.filter(thread_root_id__in=list(missing)).order_by("thread_root_id", "thread_path")
+        for post in thread_posts:
+            threads[post.thread_root_id].append(post)
+
+        rendered = {}
+        for root_id, root_post in missing.items():
+            rendered[keys[root_id]] = render_thread(threads[root_id] or [root_post])
+        cache.set_many(rendered, timeout)
+        fragments.update(rendered)
+
+    csrf_token = get_token(request)
+    return [
+        mark_safe(fragments[keys[root_post.id]].replace(CSRF_PLACEHOLDER, csrf_token))
+        for root_post in root_posts
+    ]
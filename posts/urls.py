@@ -0,0 +1,8 @@
+from django.urls import path
+
+from posts.views import search_view, suggest_view
+
+urlpatterns = [
+    path("api/search/", search_view, name="search"),
+    path("api/search/suggest/", suggest_view, name="search_suggest"),
+]
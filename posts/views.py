@@ -1,10 +1,16 @@
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
 from django.urls import reverse_lazy
+from django.views.decorators.http import require_GET
 from django.views.generic import ListView
 from django.views.generic.edit import FormMixin
 
 from posts.forms import PostForm
 from posts.models import Post
+from posts.pagination import KeysetPaginator
+from posts.search_service import post_search_service
+from posts.thread_cache import render_threads
 
 
 class PostsView(LoginRequiredMixin, FormMixin, ListView):
@@ -19,27 +25,31 @@ class PostsView(LoginRequiredMixin, FormMixin, ListView):
     redirect_field_name = "next"
 
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
-        
+    def get_sorting(self):
         sort_by = self.request.GET.get("sort_by", "timestamp")
         order = self.request.GET.get("order", "desc")
-        
-        if order == "asc":
-            sort_prefix = ""
-        else:
-            sort_prefix = "-"
-        
-        if sort_by == "username":
-            queryset = queryset.order_by(f"{sort_prefix}username")
-        elif sort_by == "email":
-            queryset = queryset.order_by(f"{sort_prefix}email")
-        elif sort_by == "timestamp":
-            queryset = queryset.order_by(f"{sort_prefix}timestamp")
-        else:
-            queryset = queryset.order_by("-timestamp")
-        
-        return queryset
+
+        if sort_by not in ("username", "email", "timestamp"):
+            return "timestamp", True
+
+        return sort_by, order != "asc"
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(parent_post__isnull=True)
+
+        sort_field, descending = self.get_sorting()
+        sort_prefix = "-" if descending else ""
+
+        return queryset.order_by(f"{sort_prefix}{sort_field}", f"{sort_prefix}id")
+
+    def paginate_queryset(self, queryset, page_size):
+        sort_field, descending = self.get_sorting()
+        paginator = KeysetPaginator(queryset, sort_field, descending, page_size)
+        page = paginator.get_page(
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return paginator, page, page.object_list, page.has_other_pages()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -49,25 +59,7 @@ class PostsView(LoginRequiredMixin, FormMixin, ListView):
         context["current_sort"] = self.request.GET.get("sort_by", "timestamp")
         context["current_order"] = self.request.GET.get("order", "desc")
 
-        posts = context.get("posts", [])
-        final_list = []
-
-        root_posts = [post for post in posts if post.parent_post is None]
-        
-        def add_post_with_children(post, level=0):
-            post.level = level
-            children = Post.objects.filter(parent_post=post).order_by("timestamp")
-            post.has_answer_btn = children.count() == 0
-            
-            final_list.append(post)
-            
-            for child in children:
-                add_post_with_children(child, level + 2)
-        
-        for root_post in root_posts:
-            add_post_with_children(root_post)
-
-        context["posts"] = final_list
+        context["threads"] = render_threads(list(context.get("posts", [])), self.request)
         return context
 
     def post(self, request, *args, **kwargs):
@@ -93,3 +85,37 @@ class PostsView(LoginRequiredMixin, FormMixin, ListView):
             return self.form_invalid(form)
 
 
+def _int_param(request, name, default, maximum):
+    try:
+        return min(max(int(request.GET.get(name, default)), 0), maximum)
+    except ValueError:
+        return default
+
+
+def _public_hit(hit):
+    # JSON API не раскрывает адреса авторов
+    return {key: value for key, value in hit.items() if key != "email"}
+
+
+# Асинхронные представления: под ASGI поиск не занимает поток воркера на время запроса к Elasticsearch
+@require_GET
+@login_required(login_url="login")
+async def search_view(request):
+    result = await post_search_service.asearch_posts(
+        request.GET.get("q", ""),
+        size=_int_param(request, "size", 20, 100),
+        from_=_int_param(request, "from", 0, 10000),
+        filters={key: request.GET[key] for key in ("username", "date_from", "date_to") if request.GET.get(key)},
+        after=request.GET.get("after"),
+    )
+    result = dict(result, hits=[_public_hit(hit) for hit in result.get("hits", [])])
+    return JsonResponse(result, status=503 if "error" in result else 200)
+
+
+@require_GET
+@login_required(login_url="login")
+async def suggest_view(request):
+    suggestions = await post_search_service.asuggest_posts(
+        request.GET.get("q", ""), size=_int_param(request, "size", 5, 20)
+    )
+    return JsonResponse({"suggestions": suggestions})
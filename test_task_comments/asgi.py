@@ -13,4 +13,29 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_task_comments.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    if scope["type"] != "lifespan":
+        return await django_application(scope, receive, send)
+
+    # Django не обрабатывает lifespan: асинхронный клиент Elasticsearch привязываем к циклу сервера
+    # при старте и закрываем его пул при остановке, туда же - сброс статистики поиска и очереди Kafka
+    from asgiref.sync import sync_to_async
+
+    from common.kafka_client import kafka_producer
+    from posts.search_service import post_search_service
+    from posts.search_telemetry import search_telemetry
+
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await post_search_service.astart()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await post_search_service.aclose()
+            await sync_to_async(search_telemetry.close, thread_sensitive=False)()
+            await sync_to_async(kafka_producer.close, thread_sensitive=False)()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
@@ -125,6 +125,22 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test_task_comments",
+    }
+}
+
+POSTS_THREAD_CACHE_TIMEOUT = int(os.getenv("POSTS_THREAD_CACHE_TIMEOUT", 60 * 60))
+
+POSTS_IMAGE_WORKERS = int(os.getenv("POSTS_IMAGE_WORKERS", os.cpu_count() or 1))
+POSTS_IMAGE_MAX_PENDING = int(os.getenv("POSTS_IMAGE_MAX_PENDING", 32))
+# через сколько секунд process_pending_images подбирает необработанные изображения
+POSTS_IMAGE_PENDING_GRACE = int(os.getenv("POSTS_IMAGE_PENDING_GRACE", 300))
+# "pool" - обработка в пуле процессов веб-сервера, "consumer" - в consume_post_events
+POSTS_IMAGE_PROCESSING = os.getenv("POSTS_IMAGE_PROCESSING", "pool")
+
 # Kafka Configuration
 KAFKA_AVAILABLE = os.getenv("KAFKA_AVAILABLE", "false").lower() == "true"
 
@@ -141,6 +157,42 @@ else:
 
 KAFKA_POSTS_TOPIC = os.getenv("KAFKA_POSTS_TOPIC", "posts")
 
+KAFKA_PRODUCER_CONFIG = {
+    "async": os.getenv("KAFKA_PRODUCER_ASYNC", "true").lower() == "true",
+    "acks": os.getenv("KAFKA_PRODUCER_ACKS", "all"),
+    "linger_ms": int(os.getenv("KAFKA_PRODUCER_LINGER_MS", 20)),
+    "batch_size": int(os.getenv("KAFKA_PRODUCER_BATCH_SIZE", 64 * 1024)),
+    # "none" отключает сжатие пакетов producer'ом
+    "compression_type": os.getenv("KAFKA_PRODUCER_COMPRESSION", "gzip").lower(),
+    "queue_size": int(os.getenv("KAFKA_PRODUCER_QUEUE_SIZE", 10000)),
+    "overflow_policy": os.getenv("KAFKA_PRODUCER_OVERFLOW_POLICY", "drop_oldest"),
+    "block_timeout": float(os.getenv("KAFKA_PRODUCER_BLOCK_TIMEOUT", 1.0)),
+}
+if KAFKA_PRODUCER_CONFIG["compression_type"] in ("", "none"):
+    KAFKA_PRODUCER_CONFIG["compression_type"] = None
+
+KAFKA_EVENT_CODEC = {
+    # "msgpack" - бинарный формат со схемами из common/event_schemas, "json" - прежний формат
+    "format": os.getenv("KAFKA_EVENT_FORMAT", "msgpack"),
+    "schema_dir": os.path.join(BASE_DIR, "common", "event_schemas"),
+    # zlib отдельных событий и сжатие пакетов producer'ом взаимоисключающие: повторное сжатие
+    # уже сжатых данных только тратит CPU. Список действует при KAFKA_PRODUCER_COMPRESSION=none
+    "compress_events": [
+        name for name in os.getenv("KAFKA_EVENT_COMPRESS", "post_created,search_query,search_query_rollup").split(",") if name
+    ] if KAFKA_PRODUCER_CONFIG["compression_type"] is None else [],
+    "compress_min_bytes": int(os.getenv("KAFKA_EVENT_COMPRESS_MIN_BYTES", 512)),
+}
+
+KAFKA_SPOOL_CONFIG = {
+    "directory": os.getenv("KAFKA_SPOOL_DIR", os.path.join(BASE_DIR, "kafka_spool")),
+    "segment_bytes": int(os.getenv("KAFKA_SPOOL_SEGMENT_BYTES", 8 * 1024 * 1024)),
+    "max_bytes": int(os.getenv("KAFKA_SPOOL_MAX_BYTES", 256 * 1024 * 1024)),
+    "fsync_every": int(os.getenv("KAFKA_SPOOL_FSYNC_EVERY", 100)),
+    "fsync_interval": float(os.getenv("KAFKA_SPOOL_FSYNC_INTERVAL", 1.0)),
+    "init_retry_interval": float(os.getenv("KAFKA_INIT_RETRY_INTERVAL", 30)),
+    "replay_interval": float(os.getenv("KAFKA_SPOOL_REPLAY_INTERVAL", 5)),
+}
+
 # Logging configuration for Kafka
 LOGGING = {
     "version": 1,
@@ -221,6 +273,62 @@ else:
         }
     }
 
+# Клиент сервиса поиска: пул соединений на узел, таймаут запроса по умолчанию и повторы
+ELASTICSEARCH_CLIENT = {
+    "connections_per_node": int(os.getenv("ELASTICSEARCH_CONNECTIONS_PER_NODE", 10)),
+    "request_timeout": float(os.getenv("ELASTICSEARCH_REQUEST_TIMEOUT", 10)),
+    "max_retries": int(os.getenv("ELASTICSEARCH_MAX_RETRIES", 2)),
+    "retry_on_timeout": True,
+}
+# Дедлайн одного поискового запроса (search, msearch, автодополнение), секунды
+SEARCH_REQUEST_TIMEOUT = float(os.getenv("SEARCH_REQUEST_TIMEOUT", 2))
+# Circuit breaker вокруг Elasticsearch: размыкается при доле ошибок или медленных вызовов в окне,
+# на время open_seconds чтение уходит в базу данных, а запись - в outbox
+ELASTICSEARCH_CIRCUIT_BREAKER = {
+    "window": int(os.getenv("ELASTICSEARCH_BREAKER_WINDOW", 50)),
+    "min_calls": int(os.getenv("ELASTICSEARCH_BREAKER_MIN_CALLS", 10)),
+    "error_rate": float(os.getenv("ELASTICSEARCH_BREAKER_ERROR_RATE", 0.5)),
+    "slow_call_ms": float(os.getenv("ELASTICSEARCH_BREAKER_SLOW_CALL_MS", 1000)),
+    "slow_rate": float(os.getenv("ELASTICSEARCH_BREAKER_SLOW_RATE", 0.8)),
+    "open_seconds": float(os.getenv("ELASTICSEARCH_BREAKER_OPEN_SECONDS", 30)),
+    "half_open_calls": int(os.getenv("ELASTICSEARCH_BREAKER_HALF_OPEN_CALLS", 3)),
+}
+
 ELASTICSEARCH_HOST = os.getenv("ELASTICSEARCH_HOST", "localhost")
 ELASTICSEARCH_PORT = int(os.getenv("ELASTICSEARCH_PORT", 9200))
+# Изменения постов видны в поиске с этой задержкой; меньше значение - больше нагрузка на кластер
+ELASTICSEARCH_REFRESH_INTERVAL = os.getenv("ELASTICSEARCH_REFRESH_INTERVAL", "5s")
 ELASTICSEARCH_INDEX_PREFIX = os.getenv("ELASTICSEARCH_INDEX_PREFIX", "test_task_comments")
+
+# Индексация выполняется через outbox (python manage.py search_outbox_relay)
+ELASTICSEARCH_DSL_AUTOSYNC = False
+# /metrics/ доступны персоналу (is_staff) и, если токен задан, по заголовку Authorization: Bearer <токен>
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Кеш результатов поиска сбрасывается по поколению индекса, которое хранится в базе
+# (SearchGeneration) и поэтому общее для всех процессов
+SEARCH_RESULT_CACHE = {
+    "max_entries": int(os.getenv("SEARCH_RESULT_CACHE_SIZE", 1000)),
+    "ttl": int(os.getenv("SEARCH_RESULT_CACHE_TTL", 30)),
+}
+
+# Время жизни point-in-time контекста между страницами поиска по курсору
+SEARCH_PIT_KEEP_ALIVE = os.getenv("SEARCH_PIT_KEEP_ALIVE", "1m")
+
+# Подсказки поиска отдаются из индекса префиксов в памяти процесса
+SEARCH_SUGGESTIONS = {
+    "refresh_interval": int(os.getenv("SEARCH_SUGGESTIONS_REFRESH", 300)),
+    "recent_posts": int(os.getenv("SEARCH_SUGGESTIONS_RECENT_POSTS", 5000)),
+    "max_terms": int(os.getenv("SEARCH_SUGGESTIONS_MAX_TERMS", 50000)),
+}
+
+# Статистика поисковых запросов агрегируется в процессе и отправляется в Kafka раз в окно
+SEARCH_TELEMETRY = {
+    "window_seconds": int(os.getenv("SEARCH_TELEMETRY_WINDOW", 60)),
+    "sample_rate": float(os.getenv("SEARCH_TELEMETRY_SAMPLE_RATE", 0.01)),
+    "max_samples": int(os.getenv("SEARCH_TELEMETRY_MAX_SAMPLES", 100)),
+    "max_queries": int(os.getenv("SEARCH_TELEMETRY_MAX_QUERIES", 1000)),
+}
+SEARCH_OUTBOX_BATCH_SIZE = int(os.getenv("SEARCH_OUTBOX_BATCH_SIZE", 500))
+SEARCH_OUTBOX_POLL_INTERVAL = float(os.getenv("SEARCH_OUTBOX_POLL_INTERVAL", 1.0))
+SEARCH_OUTBOX_RETENTION = int(os.getenv("SEARCH_OUTBOX_RETENTION", 24 * 60 * 60))
@@ -11,6 +11,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path("", PostsView.as_view(), name="posts"),
     path("", include("users.urls")),
+    path("", include("common.urls")),
+    path("", include("posts.urls")),
     path('graphql/', csrf_exempt(GraphQLView.as_view(graphiql=True))),
 ]
 